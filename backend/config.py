@@ -35,6 +35,9 @@ TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
 GOOGLE_SHEET_URL = os.getenv("GOOGLE_SHEET_URL", "")
 
+# Local sheet_writer_daemon.py port (shared gspread session for all runners)
+SHEET_WRITER_PORT = int(os.getenv("SHEET_WRITER_PORT", "8765"))
+
 YOUTUBE_PLAYLIST_URL = os.getenv("YOUTUBE_PLAYLIST_URL", "")
 
 # Odysee
@@ -20,9 +20,12 @@ if LOCAL_BIN not in os.environ.get("PATH", ""):
     os.environ["PATH"] = LOCAL_BIN + ":" + os.environ.get("PATH", "")
 
 
+_YT_ID_RE = re.compile(r'(?:v=|youtu\.be/)([a-zA-Z0-9_-]{11})')
+
+
 def _extract_video_id(url):
     """Extract YouTube video ID from various URL formats."""
-    match = re.search(r'(?:v=|youtu\.be/)([a-zA-Z0-9_-]{11})', url)
+    match = _YT_ID_RE.search(url)
     return match.group(1) if match else 'unknown'
 
 
@@ -69,7 +72,7 @@ def _get_env():
     return env
 
 
-def download_video(video_url, output_prefix=None):
+def download_video(video_url, output_prefix=None, extra_args=None):
     """
     Download the highest quality video from a YouTube URL.
 
@@ -78,6 +81,9 @@ def download_video(video_url, output_prefix=None):
       - Chrome cookies for authentication
       - ffmpeg for merging video+audio streams
 
+    extra_args are appended to the yt-dlp command line (e.g. request
+    throttling on a retry).
+
     Returns dict with video_id, title, description, video_path, info_path, thumb_path.
     """
     video_id = output_prefix or _extract_video_id(video_url)
@@ -103,6 +109,7 @@ def download_video(video_url, output_prefix=None):
             "--js-runtimes", "node",
             "--cookies-from-browser", "chrome",
             "--merge-output-format", "mp4",
+            *(extra_args or []),
             video_url,
         ]
 
@@ -131,12 +138,18 @@ def download_video(video_url, output_prefix=None):
         print(f"  All download methods failed for {video_url}")
         return None
 
+    # One directory listing instead of a stat() per sidecar candidate
+    prefix = f"{video_id}."
+    with os.scandir(DOWNLOAD_DIR) as it:
+        sidecars = {entry.name for entry in it if entry.name.startswith(prefix)}
+
     # --- Read title/description from info.json ---
     title = ''
     description = ''
     info_path = f"{base_path}.info.json"
+    has_info = f"{video_id}.info.json" in sidecars
     try:
-        if os.path.exists(info_path):
+        if has_info:
             with open(info_path, 'r', encoding='utf-8') as f:
                 info_data = json.load(f)
                 title = info_data.get('title', '')
@@ -154,17 +167,16 @@ def download_video(video_url, output_prefix=None):
     # --- Find thumbnail ---
     thumb_path = None
     for ext in ['jpg', 'webp', 'png']:
-        possible_thumb = f"{base_path}.{ext}"
-        if os.path.exists(possible_thumb):
-            thumb_path = possible_thumb
+        if f"{video_id}.{ext}" in sidecars:
+            thumb_path = f"{base_path}.{ext}"
             break
 
     return {
         'video_id': video_id,
         'title': title,
         'description': description,
-        'video_path': video_path if os.path.exists(video_path) else None,
-        'info_path': info_path if os.path.exists(info_path) else None,
+        'video_path': video_path,  # Checked above
+        'info_path': info_path if has_info else None,
         'thumb_path': thumb_path,
     }
 
@@ -1,23 +1,85 @@
 import os
+import sys
+import json
 import time
 import schedule
-import yt_dlp
+from concurrent.futures import ThreadPoolExecutor
 from config import YOUTUBE_PLAYLIST_URL
-from downloader import download_video
 from uploader_dailymotion import upload_to_dailymotion
 from uploader_bitchute import upload_to_bitchute
+from pipeline import cleanup_download, load_archive, load_playlist, prefetch_downloads
 from db import add_video, update_status, get_pending_videos
-from notifier import notify_new_video, notify_upload_success, notify_upload_failed, notify_milestone, update_google_sheet
+from notifier import notify_new_video, notify_upload_success, notify_upload_failed, notify_milestone, update_google_sheet, flush_sheet_updates, flush_notifications
 
 # In a real scenario, we'd track last_checked to only download new videos
 # For now, yt-dlp's download archive can handle skipping already downloaded videos.
 DL_ARCHIVE = 'download_archive.txt'
-
-def check_for_new_videos():
-    print("Checking YouTube playlist for new videos...")
-    if not YOUTUBE_PLAYLIST_URL:
-        print("No YOUTUBE_PLAYLIST_URL configured.")
-        return
+PLAYLIST_CACHE = 'main_playlist.json'  # Reused for PLAYLIST_CACHE_TTL; pass --force to re-extract
+
+# Platform -> unix time until which uploads are skipped after a rate limit.
+# Kept on disk so a restart doesn't re-hit the API during the cooldown.
+RATE_LIMIT_STATE = 'rate_limits.json'
+
+# Runs the Bitchute and Dailymotion uploads of one video concurrently
+_upload_pool = ThreadPoolExecutor(max_workers=2)
+
+
+def _upload_bitchute(video_id, video_path, title, thumb_path):
+    """Upload to Bitchute and record the result. Returns (sheet status, link)."""
+    update_status(video_id, "bitchute", "uploading")
+    if upload_to_bitchute(video_path, title, "", thumb_path):
+        update_status(video_id, "bitchute", "completed")
+        return "Uploaded", ""
+    update_status(video_id, "bitchute", "failed")
+    return "Failed", ""
+
+
+def _load_rate_limits():
+    try:
+        with open(RATE_LIMIT_STATE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_rate_limit(platform, until):
+    state = _load_rate_limits()
+    state[platform] = until
+    # Write-then-rename, so a crash mid-write can't leave truncated JSON
+    # that would read back as "no cooldown"
+    tmp_path = RATE_LIMIT_STATE + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, RATE_LIMIT_STATE)
+
+
+def _upload_dailymotion(video_id, video_path, title, desc):
+    """Upload to Dailymotion (per-video auth + retries) and record the result. Returns (sheet status, link)."""
+    # Still cooling down from a daily-limit hit: skip without uploading the file
+    if time.time() < _load_rate_limits().get("dailymotion", 0):
+        update_status(video_id, "dailymotion", "rate_limited")
+        return "Rate Limited", ""
+
+    update_status(video_id, "dailymotion", "uploading")
+    dm_id = upload_to_dailymotion(video_path, title, desc)
+
+    if isinstance(dm_id, tuple) and dm_id[0] == "RATE_LIMITED":
+        # Rate limited — mark as pending, skip Dailymotion until the limit
+        # resets and continue with the next video
+        # (run_dailymotion.py handles the pause; main.py just skips)
+        _save_rate_limit("dailymotion", time.time() + dm_id[1])
+        update_status(video_id, "dailymotion", "rate_limited")
+        return "Rate Limited", ""
+    if dm_id:
+        update_status(video_id, "dailymotion", "completed")
+        return "Uploaded", f"https://www.dailymotion.com/video/{dm_id}"
+    update_status(video_id, "dailymotion", "failed")
+    return "Failed", ""
+
+
+def _extract_playlist(playlist_url):
+    """Flat playlist entries via yt-dlp, or None if the playlist couldn't be read."""
+    import yt_dlp  # Heavy import, only needed here
 
     # Use yt-dlp to extract playlist context without downloading everything again
     ydl_opts = {
@@ -26,42 +88,52 @@ def check_for_new_videos():
     }
 
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(YOUTUBE_PLAYLIST_URL, download=False)
+        info = ydl.extract_info(playlist_url, download=False)
         if not info or 'entries' not in info:
-            return
+            return None
+        return [e for e in info['entries'] if e]
 
-        entries = [e for e in info['entries'] if e]
-        total_videos = len(entries)
-        print(f"Total videos in playlist: {total_videos}")
 
-        # Read downloaded
-        with open(DL_ARCHIVE, 'a+') as f:
-            f.seek(0)
-            downloaded = set(f.read().splitlines())
+def check_for_new_videos(refresh=False):
+    print("Checking YouTube playlist for new videos...")
+    if not YOUTUBE_PLAYLIST_URL:
+        print("No YOUTUBE_PLAYLIST_URL configured.")
+        return
 
-        processed_count = len(downloaded)
+    entries = load_playlist(_extract_playlist, YOUTUBE_PLAYLIST_URL, PLAYLIST_CACHE, refresh=refresh)
+    if entries is None:
+        return
+
+    total_videos = len(entries)
+    print(f"Total videos in playlist: {total_videos}")
+
+    # Read downloaded
+    downloaded = load_archive(DL_ARCHIVE)
+
+    processed_count = len(downloaded)
 
-        # Track which milestones we've hit in this run to avoid spamming
-        milestones = [25, 50, 75, 100]
-        hit_milestones = [m for m in milestones if processed_count >= (m / 100) * total_videos]
+    # Track which milestones we've hit in this run to avoid spamming
+    milestones = [25, 50, 75, 100]
+    hit_milestones = [m for m in milestones if processed_count >= (m / 100) * total_videos]
 
-        for entry in entries:
+    # Kept open (line-buffered) for the whole run: one write per video
+    archive_fp = open(DL_ARCHIVE, 'a', buffering=1)
+    cleanup_pool = ThreadPoolExecutor(max_workers=1)
+    try:
+        # 1. Download new videos on a worker thread, one ahead of the uploads
+        pending = [(None, entry) for entry in entries if entry['id'].encode() not in downloaded]
+        for _, entry, media_info in prefetch_downloads(pending, max_retries=1):
             video_url = entry.get('url')
-            if entry['id'] in downloaded:
-                continue
 
             # Found new video!
             print(f"New video found: {entry['title']}")
 
-            # 1. Download it
-            media_info = download_video(video_url)
             if not media_info or not media_info['video_path']:
                 print(f"Failed to download {video_url}")
                 continue
 
             # Update DL archive
-            with open(DL_ARCHIVE, 'a') as f:
-                f.write(f"{entry['id']}\n")
+            archive_fp.write(f"{entry['id']}\n")
 
             title = media_info['title']
             desc = media_info['description']
@@ -74,53 +146,32 @@ def check_for_new_videos():
             # 3. Notify
             notify_new_video(title)
 
-            # 4. Upload Bitchute
-            update_status(entry['id'], "bitchute", "uploading")
-            success = upload_to_bitchute(video_path, title, "", thumb_path)
-            bc_status = "Pending"
-            bc_url = ""
-            if success:
-                update_status(entry['id'], "bitchute", "completed")
+            # 4-5. Upload to Bitchute and Dailymotion at the same time; both
+            # push the same local file to independent services
+            f_bc = _upload_pool.submit(_upload_bitchute, entry['id'], video_path, title, thumb_path)
+            f_dm = _upload_pool.submit(_upload_dailymotion, entry['id'], video_path, title, desc)
+            bc_status, bc_url = f_bc.result()
+            dm_status, dm_url = f_dm.result()
+
+            if bc_status == "Uploaded":
                 notify_upload_success(title, "Bitchute")
-                bc_status = "Uploaded"
             else:
-                update_status(entry['id'], "bitchute", "failed")
                 notify_upload_failed(title, "Bitchute")
-                bc_status = "Failed"
-
-            # 5. Upload to Dailymotion (now enabled with per-video auth + retries)
-            dm_status = "Pending"
-            dm_url = ""
-            update_status(entry['id'], "dailymotion", "uploading")
-
-            dm_id = upload_to_dailymotion(video_path, title, desc)
-
-            if dm_id == "RATE_LIMITED":
-                # Rate limited — mark as pending and continue with next video
-                # (run_dailymotion.py handles the 24h sleep; main.py just skips)
-                dm_status = "Rate Limited"
-                update_status(entry['id'], "dailymotion", "rate_limited")
-            elif dm_id:
-                dm_url = f"https://www.dailymotion.com/video/{dm_id}"
-                dm_status = "Uploaded"
-                update_status(entry['id'], "dailymotion", "completed")
+
+            if dm_status == "Uploaded":
                 notify_upload_success(title, "Dailymotion")
-            else:
-                dm_status = "Failed"
-                update_status(entry['id'], "dailymotion", "failed")
+            elif dm_status == "Failed":
                 notify_upload_failed(title, "Dailymotion")
 
             # 6. Update Google Sheets
             update_google_sheet(video_url, title, bc_status, dm_status, bc_url, dm_url)
 
-            # 7. Clean up downloaded video to save disk space
-            if os.path.exists(video_path):
-                os.remove(video_path)
-                print(f"Cleaned up: {video_path}")
+            # 7. Clean up downloaded video to save disk space (in the background)
+            cleanup_pool.submit(cleanup_download, video_path)
 
             # Update counts and check milestones
             processed_count += 1
-            downloaded.add(entry['id'])
+            downloaded.add(entry['id'].encode())
 
             if total_videos > 0:
                 current_percent = (processed_count / total_videos) * 100
@@ -128,10 +179,15 @@ def check_for_new_videos():
                     if current_percent >= m and m not in hit_milestones:
                         notify_milestone(m, total_videos, processed_count)
                         hit_milestones.append(m)
+    finally:
+        archive_fp.close()
+        cleanup_pool.shutdown(wait=True)
 
 def run_scheduler():
     print("Starting video archiving worker — Full 1999 Bitchute + Dailymotion Transfer...")
-    check_for_new_videos()
+    check_for_new_videos(refresh='--force' in sys.argv)
+    flush_sheet_updates()
+    flush_notifications()
     print("Transfer complete.")
 
 if __name__ == "__main__":
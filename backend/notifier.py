@@ -1,9 +1,23 @@
-import json
+import atexit
 import requests
 import gspread
 import os
+import threading
 from datetime import datetime
-from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, GOOGLE_SHEET_URL
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, GOOGLE_SHEET_URL, SHEET_WRITER_PORT
+
+# One keep-alive session for every notification, so each message reuses the
+# TCP+TLS connection instead of re-handshaking. Retries only apply to https
+# (Telegram); the localhost sheet writer must fail fast when it isn't running.
+# sendMessage is a POST, which urllib3 only retries when the connection fails
+# before the request goes out, so a message is never sent twice.
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=4, pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.5),
+))
 
 # ---------------------------------------------------------------------------
 # Telegram
@@ -20,7 +34,7 @@ def send_telegram_message(message):
         "parse_mode": "HTML"
     }
     try:
-        requests.post(url, json=payload, timeout=10)
+        _session.post(url, json=payload, timeout=10)
     except Exception as e:
         print(f"Failed to send Telegram message: {e}")
 
@@ -60,16 +74,68 @@ def _get_gspread_client():
     return _gc_cache
 
 
+_sh_cache = None
+_worksheet_cache = {}
+
+def _get_spreadsheet():
+    """Return cached handle to the tracking spreadsheet."""
+    global _sh_cache
+    if _sh_cache is None:
+        _sh_cache = _get_gspread_client().open_by_url(GOOGLE_SHEET_URL)
+    return _sh_cache
+
+
+def _get_year_worksheet(year):
+    """Return (worksheet, created) for a year tab, creating it if needed.
+
+    Known tabs are listed once with a single worksheets() call and cached by
+    title, so later lookups don't go back to the API. A new tab is left
+    empty; the caller writes HEADERS together with its first rows.
+    """
+    sh = _get_spreadsheet()
+    if not _worksheet_cache:
+        for ws in sh.worksheets():
+            _worksheet_cache[ws.title] = ws
+
+    worksheet = _worksheet_cache.get(year)
+    if worksheet is None:
+        try:
+            worksheet = sh.add_worksheet(title=year, rows=100, cols=15)
+            created = True
+        except Exception as e:
+            # Another runner may have added the tab since the list was read;
+            # use theirs (this raises if the tab really isn't there)
+            print(f"  Sheet: Could not add tab {year} ({e}), looking it up")
+            worksheet = sh.worksheet(year)
+            created = False
+        _worksheet_cache[year] = worksheet
+        return worksheet, created
+    return worksheet, False
+
+
 def update_google_sheet(video_url, title, bc_status="", dm_status="", bc_url="", dm_url="", year="1999"):
     """Legacy wrapper — update BitChute & Dailymotion columns."""
     update_sheet_platform(video_url, title, "BitChute", bc_status, bc_url, year)
     update_sheet_platform(video_url, title, "Dailymotion", dm_status, dm_url, year)
 
 
+SHEET_WRITER_URL = f"http://127.0.0.1:{SHEET_WRITER_PORT}/update"
+
+# Sheet updates are buffered and written in batches of this size
+SHEET_BATCH_SIZE = 25
+
+_pending_updates = []
+
+
 def update_sheet_platform(video_url, title, platform, status, link="", year="2000"):
     """
     Update a single platform's status in the Google Sheet for a specific video.
 
+    If sheet_writer_daemon.py is running on this host the update is handed to
+    it (one shared gspread session for all runners). Otherwise it is buffered
+    and written every SHEET_BATCH_SIZE updates; call flush_sheet_updates()
+    when a run finishes (it also runs at interpreter exit).
+
     Args:
         video_url: YouTube video URL (used as row key)
         title: Video title
@@ -81,54 +147,142 @@ def update_sheet_platform(video_url, title, platform, status, link="", year="200
     if not GOOGLE_SHEET_URL or not status:
         return
 
-    cols = PLATFORM_COLUMNS.get(platform)
-    if not cols:
+    if platform not in PLATFORM_COLUMNS:
         print(f"Unknown platform: {platform}")
         return
 
+    update = {
+        "video_url": video_url,
+        "title": title,
+        "platform": platform,
+        "status": status,
+        "link": link,
+        "year": year,
+    }
     try:
-        gc = _get_gspread_client()
-        sh = gc.open_by_url(GOOGLE_SHEET_URL)
+        r = _session.post(SHEET_WRITER_URL, json=update, timeout=(0.05, 1))
+        if r.status_code == 202:
+            return
+    except requests.exceptions.RequestException:
+        pass  # Daemon not running — write from this process
+
+    _pending_updates.append(update)
+    if len(_pending_updates) >= SHEET_BATCH_SIZE:
+        flush_sheet_updates()
+
+
+def flush_sheet_updates():
+    """Write any buffered sheet updates now."""
+    if not _pending_updates:
+        return
+    updates = _pending_updates[:]
+    _pending_updates.clear()
+    write_sheet_updates(updates)
 
-        # Get or create the year's worksheet
-        try:
-            worksheet = sh.worksheet(year)
-        except gspread.exceptions.WorksheetNotFound:
-            worksheet = sh.add_worksheet(title=year, rows=100, cols=15)
-            worksheet.append_row(HEADERS)
 
-        # Find the row by YouTube URL (column D = 4)
+atexit.register(flush_sheet_updates)
+
+
+def write_sheet_updates(updates):
+    """
+    Write a batch of platform status updates (dicts with the
+    update_sheet_platform fields) to the Google Sheet.
+
+    Per year tab this costs one read of columns A:D and one
+    spreadsheets.batchUpdate carrying appendCells for videos not yet in the
+    sheet and updateCells for the rest. A new tab skips the read and gets
+    its header in the same appendCells request.
+    """
+    if not GOOGLE_SHEET_URL or not updates:
+        return
+
+    by_year = {}
+    for u in updates:
+        by_year.setdefault(u["year"], []).append(u)
+
+    for year, year_updates in by_year.items():
         try:
-            cell = worksheet.find(video_url, in_column=4)
-            row_index = cell.row
-        except gspread.exceptions.CellNotFound:
+            _write_year_updates(year, year_updates)
+        except Exception as e:
+            print(f"Failed to update Google Sheet: {e}")
+
+
+def _write_year_updates(year, updates):
+    worksheet, created = _get_year_worksheet(year)
+
+    # Row lookup by YouTube URL (column D) and current names (column B).
+    # A tab created just now has nothing to read yet.
+    rows = [HEADERS] if created else worksheet.get_values("A:D")
+    row_of = {}
+    for row_index, values in enumerate(rows, 1):
+        if len(values) > 3 and values[3]:
+            row_of[values[3]] = row_index
+
+    next_number = len(rows)  # Header is row 1, so this is the next Number
+    new_rows = {}
+    cell_updates = []
+
+    for u in updates:
+        cols = PLATFORM_COLUMNS.get(u["platform"])
+        if not cols or not u["status"]:
+            continue
+        video_url, title = u["video_url"], u["title"]
+        row_index = row_of.get(video_url)
+
+        if row_index is None:
             # Row doesn't exist — append new row
-            all_vals = worksheet.col_values(1)
-            number = len(all_vals)  # Next number
-            row = [""] * 12
-            row[0] = number
-            row[1] = title
-            row[2] = "Uploaded"
-            row[3] = video_url
-            row[cols["status_col"] - 1] = status
-            row[cols["link_col"] - 1] = link
-            worksheet.append_row(row)
-            print(f"  Sheet: Added new row for {title[:50]} [{platform}={status}]")
-            return
+            row = new_rows.get(video_url)
+            if row is None:
+                row = [""] * 12
+                row[0] = next_number
+                row[1] = title
+                row[2] = "Uploaded"
+                row[3] = video_url
+                new_rows[video_url] = row
+                next_number += 1
+            row[cols["status_col"] - 1] = u["status"]
+            row[cols["link_col"] - 1] = u["link"]
+            print(f"  Sheet: Added new row for {title[:50]} [{u['platform']}={u['status']}]")
+            continue
 
         # Update the platform columns
-        worksheet.update_cell(row_index, cols["status_col"], status)
-        if link:
-            worksheet.update_cell(row_index, cols["link_col"], link)
+        cell_updates.append((row_index, cols["status_col"], u["status"]))
+        if u["link"]:
+            cell_updates.append((row_index, cols["link_col"], u["link"]))
 
         # Also update the title if it's just a video ID
-        current_name = worksheet.cell(row_index, 2).value
+        values = rows[row_index - 1]
+        current_name = values[1] if len(values) > 1 else ""
         if current_name and len(current_name) <= 12 and title and len(title) > 12:
-            worksheet.update_cell(row_index, 2, title[:200])
+            cell_updates.append((row_index, 2, title[:200]))
 
-        print(f"  Sheet: {title[:50]} [{platform}={status}]")
-    except Exception as e:
-        print(f"Failed to update Google Sheet: {e}")
+        print(f"  Sheet: {title[:50]} [{u['platform']}={u['status']}]")
+
+    # New rows (plus the header of a new tab) and cell updates all go out in
+    # one spreadsheets.batchUpdate call
+    rows_to_append = ([HEADERS] if created else []) + list(new_rows.values())
+    sheet_requests = []
+    if rows_to_append:
+        sheet_requests.append({"appendCells": {
+            "sheetId": worksheet.id,
+            "rows": [{"values": [_cell_data(v) for v in row]} for row in rows_to_append],
+            "fields": "userEnteredValue",
+        }})
+    for row_index, col, value in cell_updates:
+        sheet_requests.append({"updateCells": {
+            "start": {"sheetId": worksheet.id, "rowIndex": row_index - 1, "columnIndex": col - 1},
+            "rows": [{"values": [_cell_data(value)]}],
+            "fields": "userEnteredValue",
+        }})
+    if sheet_requests:
+        _get_spreadsheet().batch_update({"requests": sheet_requests})
+
+
+def _cell_data(value):
+    """CellData for a raw value, as append_rows/update would have written it."""
+    if isinstance(value, (int, float)):
+        return {"userEnteredValue": {"numberValue": value}}
+    return {"userEnteredValue": {"stringValue": str(value)}}
 
 
 # ---------------------------------------------------------------------------
@@ -138,7 +292,20 @@ def notify_new_video(title):
     msg = f"🚀 <b>New Video Downloaded</b>\n<i>{title}</i>\nStarting uploads..."
     send_telegram_message(msg)
 
+# Success notices are batched into one message every NOTIFY_BATCH_SIZE
+# uploads or NOTIFY_FLUSH_INTERVAL seconds; failures are still sent at once.
+# The interval is kept by a timer started with the first buffered notice, so
+# a lone success isn't held back by a long upload or a run of failures.
+NOTIFY_BATCH_SIZE = 10
+NOTIFY_FLUSH_INTERVAL = 300
+
+_success_buffer = []
+_success_lock = threading.Lock()
+_flush_timer = None
+
+
 def notify_upload_success(title, platform, current=0, total=0):
+    global _flush_timer
     progress = f" ({current}/{total})" if total > 0 else ""
     icons = {
         "Rumble": "🟢",
@@ -147,9 +314,31 @@ def notify_upload_success(title, platform, current=0, total=0):
         "Odysee": "🟣",
     }
     icon = icons.get(platform, "⬜")
-    msg = f"{icon} <b>{platform}{progress}</b>\n✅ {title}"
+    with _success_lock:
+        _success_buffer.append(f"{icon} <b>{platform}{progress}</b>\n✅ {title}")
+        full = len(_success_buffer) >= NOTIFY_BATCH_SIZE
+        if not full and _flush_timer is None:
+            _flush_timer = threading.Timer(NOTIFY_FLUSH_INTERVAL, flush_notifications)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+    if full:
+        flush_notifications()
+
+def flush_notifications():
+    """Send any buffered success notices as a single message."""
+    global _flush_timer
+    with _success_lock:
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+        if not _success_buffer:
+            return
+        msg = "\n\n".join(_success_buffer)
+        _success_buffer.clear()
     send_telegram_message(msg)
 
+atexit.register(flush_notifications)
+
 def notify_upload_failed(title, platform, error="", current=0, total=0):
     progress = f" ({current}/{total})" if total > 0 else ""
     icons = {
@@ -11,24 +11,18 @@ Usage:
 import os
 import sys
 import json
-import time
 import requests
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from uploader_odysee import _save_token
 
 TOKEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'odysee_token.json')
 ODYSEE_API = "https://api.odysee.com"
 
 
 def save_token(auth_token, email=""):
-    """Save auth token to disk."""
-    with open(TOKEN_FILE, 'w') as f:
-        json.dump({
-            'auth_token': auth_token,
-            'email': email,
-            'saved_at': time.strftime('%Y-%m-%d %H:%M:%S'),
-        }, f, indent=2)
-    print(f"Token saved to {TOKEN_FILE}")
+    """Save auth token to disk (atomically, shared with the uploader)."""
+    _save_token(auth_token, email)
 
 
 def verify_token(token=None):
@@ -0,0 +1,285 @@
+"""
+Shared download/upload pipeline for the per-platform runners.
+
+Downloads run on a background thread and feed a small bounded queue, so the
+next video is already on disk while the current one uploads.
+"""
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import mmap
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from downloader import download_video
+from notifier import send_telegram_message, update_sheet_platform, notify_upload_success, notify_upload_failed, flush_sheet_updates, flush_notifications
+
+# How many times to retry a failed *download* before giving up on that video
+MAX_DOWNLOAD_RETRIES = 2
+
+# Extracted playlists are reused from disk for this long (seconds), so a
+# restart doesn't re-fetch a playlist that hasn't changed
+PLAYLIST_CACHE_TTL = 6 * 60 * 60
+
+# Added to yt-dlp on download retries only, so the first attempt runs
+# unthrottled and retries back off from YouTube's rate limiting
+RETRY_THROTTLE_ARGS = ["--sleep-requests", "3", "--sleep-interval", "5"]
+
+_YT_ID_RE = re.compile(r'(?:v=|youtu\.be/)([a-zA-Z0-9_-]{11})')
+
+
+def entry_url(entry):
+    """YouTube watch URL for a playlist entry."""
+    return entry.get('url', f"https://www.youtube.com/watch?v={entry['id']}")
+
+
+def extract_pytubefix_playlist(playlist_url):
+    """Return playlist entries as [{'id', 'url', 'title'}] via pytubefix."""
+    from pytubefix import Playlist  # Heavy import, only needed here
+
+    pl = Playlist(playlist_url)
+    entries = []
+    for url in pl.video_urls:
+        match = _YT_ID_RE.search(url)
+        vid_id = match.group(1) if match else 'unknown'
+        entries.append({'id': vid_id, 'url': url, 'title': vid_id})
+    return entries
+
+
+def load_archive(path):
+    """
+    Return the set of entries (video IDs or digests) already recorded in an
+    archive file, as ASCII bytes; test membership with value.encode().
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return set()  # mmap can't map an empty file
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Line by line straight off the mapping; no copy of the whole file
+            entries = {line.strip() for line in iter(mm.readline, b'')}
+    entries.discard(b'')
+    return entries
+
+
+def load_playlist(extract_playlist, playlist_url, cache_path=None, ttl=PLAYLIST_CACHE_TTL, refresh=False):
+    """
+    Return extract_playlist(playlist_url), reusing the entries saved in
+    cache_path when that file is younger than ttl and was written for the
+    same playlist URL. refresh=True ignores (and rewrites) the cache. A
+    failed extraction (None) or an empty one (e.g. a throttled or blank
+    playlist page) is not cached, so the next run tries again.
+    """
+    if cache_path and not refresh and os.path.exists(cache_path) and time.time() - os.path.getmtime(cache_path) < ttl:
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+            if cached.get('playlist_url') == playlist_url:
+                print(f"Using cached playlist from {cache_path}")
+                return cached['entries']
+        except (ValueError, KeyError, AttributeError):
+            pass  # Corrupt cache — extract again
+
+    entries = extract_playlist(playlist_url)
+    if cache_path and entries:
+        tmp_path = cache_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'playlist_url': playlist_url, 'entries': entries}, f)
+        os.replace(tmp_path, cache_path)
+    return entries
+
+
+def fetch_playlist_and_archive(extract_playlist, playlist_url, archive_path, cache_path=None, refresh=False):
+    """
+    Run the (slow, network-bound) playlist extraction and the archive file
+    read at the same time. Returns (entries, done_ids).
+    """
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        f_entries = ex.submit(load_playlist, extract_playlist, playlist_url, cache_path, refresh=refresh)
+        f_done = ex.submit(load_archive, archive_path)
+        return f_entries.result(), f_done.result()
+
+
+def notify_in_background(message):
+    """Send a Telegram message without blocking the caller."""
+    threading.Thread(target=send_telegram_message, args=(message,)).start()
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Hex SHA-256 of a file, read in 1 MB chunks."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cleanup_download(video_path):
+    """Remove a downloaded video and its yt-dlp sidecar files."""
+    video = Path(video_path)
+    try:
+        video.unlink()
+        print(f"  Cleaned up: {video_path}")
+    except FileNotFoundError:
+        pass
+
+    # One directory listing, then unlink only the sidecars that exist
+    base = video.with_suffix('')
+    wanted = {base.name + ext for ext in ['.info.json', '.jpg', '.webp', '.png']}
+    with os.scandir(base.parent) as it:
+        for entry in it:
+            if entry.name in wanted:
+                os.remove(entry.path)
+
+
+def backoff_delay(attempt, base=1.0, cap=30.0, jitter=0.5):
+    """Exponential backoff with +/- jitter: ~1s, 2s, 4s, ... capped at cap."""
+    return min(cap, base * 2 ** (attempt - 1)) * random.uniform(1 - jitter, 1 + jitter)
+
+
+def download_with_retries(video_url, max_retries=MAX_DOWNLOAD_RETRIES):
+    """Download a video, retrying up to max_retries times. Returns media_info or None."""
+    media_info = None
+    for dl_attempt in range(1, max_retries + 1):
+        extra_args = RETRY_THROTTLE_ARGS if dl_attempt > 1 else None
+        media_info = download_video(video_url, extra_args=extra_args)
+        if media_info and media_info.get('video_path'):
+            break
+        print(f"  Download attempt {dl_attempt}/{max_retries} failed")
+        if dl_attempt < max_retries:
+            time.sleep(backoff_delay(dl_attempt))
+    return media_info
+
+
+def prefetch_downloads(pending, max_retries=MAX_DOWNLOAD_RETRIES):
+    """
+    Yield (index, entry, media_info) for each (index, entry) in pending.
+
+    A producer thread downloads ahead of the caller; the queue holds one
+    finished download and the producer can hold one more, so at most two
+    videos wait on disk besides the one being uploaded. media_info is None
+    when the download permanently failed; otherwise media_info['sha256'] is
+    the file's digest (hashed here so it overlaps the previous upload).
+    """
+    q = queue.Queue(maxsize=1)
+
+    def producer():
+        try:
+            for i, entry in pending:
+                # A download that raises (e.g. the yt-dlp timeout) fails this
+                # video only; it must not kill the thread the caller waits on
+                try:
+                    media_info = download_with_retries(entry_url(entry), max_retries)
+                    if media_info and media_info.get('video_path'):
+                        # An unreadable file just gets no digest, so the
+                        # duplicate check is skipped rather than the video
+                        try:
+                            media_info['sha256'] = file_sha256(media_info['video_path'])
+                        except OSError as e:
+                            print(f"  Could not hash {media_info['video_path']}: {e}")
+                            media_info['sha256'] = None
+                except Exception as e:
+                    print(f"  Download error for {entry.get('id')}: {e}")
+                    media_info = None
+                q.put((i, entry, media_info))
+        finally:
+            q.put(None)
+
+    threading.Thread(target=producer, daemon=True).start()
+
+    while True:
+        item = q.get()
+        if item is None:
+            return
+        yield item
+
+
+def run_uploads(entries, done_ids, platform, year, archive_path, sha256_path, upload,
+                max_retries=MAX_DOWNLOAD_RETRIES):
+    """
+    Download and upload every entry whose ID isn't in done_ids, in playlist
+    order, and record each result: archive and sha256 lines, the year's
+    sheet row for platform, and the Telegram notices.
+
+    upload(video_path, title, description, media_info) does the platform's
+    upload and returns (ok, link); media_info is the download's dict, for
+    extras such as thumb_path. Videos whose bytes match an earlier upload
+    (by SHA-256) are marked done without uploading.
+
+    Returns (uploaded_count, failed_count); uploaded_count includes the
+    entries that were already done.
+    """
+    total = len(entries)
+    done_hashes = load_archive(sha256_path)
+    uploaded_count = len(done_ids)
+    failed_count = 0
+
+    # Resumed runs can skip thousands of entries: one set probe each, one summary line
+    pending = [(i, entry) for i, entry in enumerate(entries, 1) if entry['id'].encode() not in done_ids]
+    if len(pending) < total:
+        print(f"Already done: {total - len(pending)}/{total}")
+
+    # Kept open (line-buffered) for the whole batch: one write per video
+    archive_fp = open(archive_path, 'a', buffering=1)
+    sha256_fp = open(sha256_path, 'a', buffering=1)
+    # File deletes run off the main thread while the next download is picked up
+    cleanup_pool = ThreadPoolExecutor(max_workers=1)
+    try:
+        # Downloads run ahead on a worker thread while the current video uploads
+        for i, entry, media_info in prefetch_downloads(pending, max_retries):
+            vid_id = entry['id']
+            title = entry.get('title', vid_id)
+            video_url = entry_url(entry)
+
+            print(f"\n[{i}/{total}] Processing: {title}")
+
+            if not media_info or not media_info.get('video_path'):
+                print(f"  Download permanently failed!")
+                notify_upload_failed(title, platform, "Download failed", i, total)
+                failed_count += 1
+                continue
+
+            video_path = media_info['video_path']
+
+            # --- Skip byte-identical duplicates of videos already uploaded ---
+            digest = media_info.get('sha256')
+            if digest and digest.encode() in done_hashes:
+                print(f"  Duplicate of an already uploaded video (sha256 {digest[:12]}), skipping")
+                archive_fp.write(f"{vid_id}\n")
+                cleanup_pool.submit(cleanup_download, video_path)
+                continue
+
+            actual_title = media_info.get('title') or title  # Use exact YouTube title
+            description = media_info.get('description', '')
+
+            ok, link = upload(video_path, actual_title, description, media_info)
+
+            if ok:
+                uploaded_count += 1
+                archive_fp.write(f"{vid_id}\n")
+                if digest:
+                    sha256_fp.write(f"{digest}\n")
+                    done_hashes.add(digest.encode())
+                update_sheet_platform(video_url, actual_title, platform, "Uploaded", link, year=year)
+                notify_upload_success(actual_title, platform, uploaded_count, total)
+            else:
+                failed_count += 1
+                update_sheet_platform(video_url, actual_title, platform, "Failed", "", year=year)
+                notify_upload_failed(actual_title, platform, "Upload failed", i, total)
+
+            # --- Clean up downloaded file + metadata ---
+            cleanup_pool.submit(cleanup_download, video_path)
+    finally:
+        archive_fp.close()
+        sha256_fp.close()
+        cleanup_pool.shutdown(wait=True)
+        # Write any buffered Google Sheet updates and success notices, even
+        # if the run was interrupted
+        flush_sheet_updates()
+        flush_notifications()
+
+    return uploaded_count, failed_count
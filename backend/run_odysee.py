@@ -5,42 +5,41 @@ Downloads each video via yt-dlp, uploads to Odysee via TUS protocol.
 Usage:
   python run_odysee.py 2000
   python run_odysee.py 2003
+  python run_odysee.py 2003 --force   # ignore the cached playlist
 """
 import os
 import sys
 import json
-import time
-import re
-from pytubefix import Playlist
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from config import YOUTUBE_PLAYLIST_URL_2000, YOUTUBE_PLAYLIST_URL_2003
-from downloader import download_video
 from uploader_odysee import upload_to_odysee
-from notifier import send_telegram_message, update_sheet_platform, notify_upload_success, notify_upload_failed
+from notifier import send_telegram_message
+from pipeline import extract_pytubefix_playlist, fetch_playlist_and_archive, notify_in_background, run_uploads
 
 YEAR = "2000"
 
 YEAR_CONFIG = {
     "2000": {
-        "playlist_env": "YOUTUBE_PLAYLIST_URL_2000",
+        "playlist_url": YOUTUBE_PLAYLIST_URL_2000,
     },
     "2003": {
-        "playlist_env": "YOUTUBE_PLAYLIST_URL_2003",
+        "playlist_url": YOUTUBE_PLAYLIST_URL_2003,
     },
 }
 
-MAX_DOWNLOAD_RETRIES = 2
 ODYSEE_ARCHIVE = None
+ODYSEE_SHA256 = None  # SHA-256 digests of uploaded files
 
 
 def main():
-    global YEAR, ODYSEE_ARCHIVE
+    global YEAR, ODYSEE_ARCHIVE, ODYSEE_SHA256
 
     if len(sys.argv) > 1 and sys.argv[1] in YEAR_CONFIG:
         YEAR = sys.argv[1]
 
     ODYSEE_ARCHIVE = f'odysee_archive_{YEAR}.txt'
+    ODYSEE_SHA256 = f'odysee_sha256_{YEAR}.txt'
 
     config = YEAR_CONFIG.get(YEAR)
     if not config:
@@ -50,97 +49,27 @@ def main():
     print(f"Starting {YEAR} -> Odysee Transfer...")
 
     # --- Extract playlist ---
-    playlist_url = os.getenv(config['playlist_env'], '')
+    playlist_url = config['playlist_url']
     if not playlist_url:
-        print(f"ERROR: {config['playlist_env']} not configured")
+        print(f"ERROR: YOUTUBE_PLAYLIST_URL_{YEAR} not configured")
         return
 
     print(f"Fetching playlist: {playlist_url}")
-    pl = Playlist(playlist_url)
-    video_urls = list(pl.video_urls)
-
-    entries = []
-    for url in video_urls:
-        match = re.search(r'(?:v=|youtu\.be/)([a-zA-Z0-9_-]{11})', url)
-        vid_id = match.group(1) if match else 'unknown'
-        entries.append({'id': vid_id, 'url': url, 'title': vid_id})
+    entries, done_ids = fetch_playlist_and_archive(extract_pytubefix_playlist, playlist_url, ODYSEE_ARCHIVE, f'odysee_playlist_{YEAR}.json', refresh='--force' in sys.argv)
 
     total = len(entries)
     print(f"Total videos: {total}")
 
-    send_telegram_message(
+    notify_in_background(
         f"<b>Starting {YEAR} -> Odysee</b>\n"
         f"{total} videos to upload"
     )
 
-    # --- Read already uploaded ---
-    if os.path.exists(ODYSEE_ARCHIVE):
-        with open(ODYSEE_ARCHIVE) as f:
-            done_ids = set(f.read().splitlines())
-    else:
-        done_ids = set()
-
-    uploaded_count = len(done_ids)
-    failed_count = 0
-
-    for i, entry in enumerate(entries, 1):
-        vid_id = entry['id']
-        title = entry.get('title', vid_id)
-        video_url = entry.get('url', f'https://www.youtube.com/watch?v={vid_id}')
-
-        if vid_id in done_ids:
-            print(f"[{i}/{total}] Already done: {title}")
-            continue
-
-        print(f"\n[{i}/{total}] Processing: {title}")
-
-        # --- Download ---
-        media_info = None
-        for dl_attempt in range(1, MAX_DOWNLOAD_RETRIES + 1):
-            media_info = download_video(video_url)
-            if media_info and media_info.get('video_path'):
-                break
-            print(f"  Download attempt {dl_attempt}/{MAX_DOWNLOAD_RETRIES} failed")
-            if dl_attempt < MAX_DOWNLOAD_RETRIES:
-                time.sleep(10)
-
-        if not media_info or not media_info.get('video_path'):
-            print(f"  Download permanently failed!")
-            notify_upload_failed(title, "Odysee", "Download failed", i, total)
-            failed_count += 1
-            continue
-
-        video_path = media_info['video_path']
-        actual_title = media_info.get('title') or title
-        description = media_info.get('description', '')
-
-        # --- Upload to Odysee ---
-        claim_id = upload_to_odysee(video_path, actual_title, description)
-
-        if claim_id:
-            uploaded_count += 1
-            odysee_url = f"https://odysee.com/search?q={claim_id}" if claim_id else ""
-
-            with open(ODYSEE_ARCHIVE, 'a') as f:
-                f.write(f"{vid_id}\n")
-
-            update_sheet_platform(video_url, actual_title, "Odysee", "Uploaded", odysee_url, year=YEAR)
-            notify_upload_success(actual_title, "Odysee", uploaded_count, total)
-        else:
-            failed_count += 1
-            update_sheet_platform(video_url, actual_title, "Odysee", "Failed", "", year=YEAR)
-            notify_upload_failed(actual_title, "Odysee", "Upload failed", i, total)
-
-        # --- Clean up ---
-        if os.path.exists(video_path):
-            os.remove(video_path)
-            print(f"  Cleaned up: {video_path}")
-
-        base_path = os.path.splitext(video_path)[0]
-        for ext in ['.info.json', '.jpg', '.webp', '.png']:
-            meta_file = base_path + ext
-            if os.path.exists(meta_file):
-                os.remove(meta_file)
+    def upload(video_path, title, description, media_info):
+        claim_id = upload_to_odysee(video_path, title, description)
+        return bool(claim_id), f"https://odysee.com/search?q={claim_id}" if claim_id else ""
+
+    uploaded_count, failed_count = run_uploads(entries, done_ids, "Odysee", YEAR, ODYSEE_ARCHIVE, ODYSEE_SHA256, upload)
 
     # --- Summary ---
     summary = (
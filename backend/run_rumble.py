@@ -9,19 +9,19 @@ Features:
   - Upload retries (inside uploader_rumble.py)
   - Telegram notifications for progress/failures
   - Google Sheets tracking
+  - Playlist cached on disk for 6h (pass --force to re-extract)
 """
 import os
 import sys
 import json
-import time
-import re
 import subprocess
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from config import YOUTUBE_PLAYLIST_URL_2000, YOUTUBE_PLAYLIST_URL_2003, RUMBLE_CHANNEL_NAME
-from downloader import download_video, YTDLP_VENV_PYTHON
+from downloader import YTDLP_VENV_PYTHON
 from uploader_rumble import upload_to_rumble
-from notifier import send_telegram_message, update_google_sheet, update_sheet_platform, notify_upload_success, notify_upload_failed
+from notifier import send_telegram_message, update_google_sheet
+from pipeline import extract_pytubefix_playlist, fetch_playlist_and_archive, notify_in_background, run_uploads
 
 # Can be overridden via command line: python run_rumble.py 2003
 YEAR = "2000"
@@ -29,29 +29,76 @@ YEAR = "2000"
 # Map years to playlist URLs and Rumble channel names
 YEAR_CONFIG = {
     "2000": {
-        "playlist_env": "YOUTUBE_PLAYLIST_URL_2000",
+        "playlist_url": YOUTUBE_PLAYLIST_URL_2000,
         "channel": "2000",
     },
     "2003": {
-        "playlist_env": "YOUTUBE_PLAYLIST_URL_2003",
+        "playlist_url": YOUTUBE_PLAYLIST_URL_2003,
         "channel": "2003archivedhmm",
     },
 }
 
 RUMBLE_ARCHIVE = None  # Set in main() based on YEAR
+RUMBLE_SHA256 = None  # SHA-256 digests of uploaded files
 
-# How many times to retry a failed download before giving up
-MAX_DOWNLOAD_RETRIES = 2
+
+def _extract_playlist(playlist_url):
+    """
+    Return playlist entries as [{'id', 'url', 'title'}] via a yt-dlp
+    --flat-playlist call, falling back to pytubefix if yt-dlp fails.
+    Returns None if both fail.
+    """
+    cmd = [
+        YTDLP_VENV_PYTHON, "-m", "yt_dlp",
+        "--flat-playlist",
+        "--lazy-playlist",  # Emit entries as pages arrive, not after full enumeration
+        "--print-json",
+        "--no-warnings",
+        # Fail fast on a flaky network so the pytubefix fallback still has time
+        "--retries", "2",
+        "--extractor-retries", "2",
+        "--socket-timeout", "20",
+        playlist_url,
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+        error = result.stderr[-300:] if result.returncode != 0 else None
+    except subprocess.TimeoutExpired:
+        error = "timed out after 120s"
+
+    if error:
+        print(f"ERROR: Failed to extract playlist: {error}")
+        print("Falling back to pytubefix ...")
+        try:
+            return extract_pytubefix_playlist(playlist_url)
+        except Exception as e:
+            print(f"ERROR: pytubefix playlist fallback failed: {e}")
+            return None
+
+    entries = []
+    for line in result.stdout.splitlines():
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            vid_id = data.get('id', 'unknown')
+            title = data.get('title', vid_id)
+            url = data.get('url') or data.get('webpage_url') or f'https://www.youtube.com/watch?v={vid_id}'
+            entries.append({'id': vid_id, 'url': url, 'title': title})
+        except json.JSONDecodeError:
+            continue
+    return entries
 
 
 def main():
-    global YEAR, RUMBLE_ARCHIVE
+    global YEAR, RUMBLE_ARCHIVE, RUMBLE_SHA256
 
     # Allow year override via command line
     if len(sys.argv) > 1 and sys.argv[1] in YEAR_CONFIG:
         YEAR = sys.argv[1]
 
     RUMBLE_ARCHIVE = f'rumble_archive_{YEAR}.txt'
+    RUMBLE_SHA256 = f'rumble_sha256_{YEAR}.txt'
 
     config = YEAR_CONFIG.get(YEAR)
     if not config:
@@ -66,115 +113,30 @@ def main():
     cfg.RUMBLE_CHANNEL_NAME = config['channel']
 
     # --- Extract playlist via yt-dlp ---
-    playlist_url = os.getenv(config['playlist_env'], '')
+    playlist_url = config['playlist_url']
     if not playlist_url:
-        print(f"ERROR: {config['playlist_env']} not configured in .env")
+        print(f"ERROR: YOUTUBE_PLAYLIST_URL_{YEAR} not configured in .env")
         return
 
     print(f"Fetching playlist: {playlist_url}")
-    cmd = [
-        YTDLP_VENV_PYTHON, "-m", "yt_dlp",
-        "--flat-playlist",
-        "--print-json",
-        "--no-warnings",
-        playlist_url,
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-    if result.returncode != 0:
-        print(f"ERROR: Failed to extract playlist: {result.stderr[-300:]}")
+    entries, done_ids = fetch_playlist_and_archive(_extract_playlist, playlist_url, RUMBLE_ARCHIVE, f'rumble_playlist_{YEAR}.json', refresh='--force' in sys.argv)
+    if entries is None:
         return
 
-    entries = []
-    for line in result.stdout.strip().split('\n'):
-        if not line.strip():
-            continue
-        try:
-            data = json.loads(line)
-            vid_id = data.get('id', 'unknown')
-            title = data.get('title', vid_id)
-            url = data.get('url') or data.get('webpage_url') or f'https://www.youtube.com/watch?v={vid_id}'
-            entries.append({'id': vid_id, 'url': url, 'title': title})
-        except json.JSONDecodeError:
-            continue
-
     total = len(entries)
     print(f"Total videos: {total}")
 
-    send_telegram_message(
+    notify_in_background(
         f"<b>Starting {YEAR} -> Rumble</b>\n"
         f"{total} videos to upload"
     )
 
-    # --- Read already uploaded ---
-    if os.path.exists(RUMBLE_ARCHIVE):
-        with open(RUMBLE_ARCHIVE) as f:
-            done_ids = set(f.read().splitlines())
-    else:
-        done_ids = set()
-
-    uploaded_count = len(done_ids)
-    failed_count = 0
-
-    for i, entry in enumerate(entries, 1):
-        vid_id = entry['id']
-        title = entry.get('title', vid_id)
-        video_url = entry.get('url', f'https://www.youtube.com/watch?v={vid_id}')
-
-        if vid_id in done_ids:
-            print(f"[{i}/{total}] Already done: {title}")
-            continue
-
-        print(f"\n[{i}/{total}] Processing: {title}")
-
-        # --- Download (with retries) ---
-        media_info = None
-        for dl_attempt in range(1, MAX_DOWNLOAD_RETRIES + 1):
-            media_info = download_video(video_url)
-            if media_info and media_info.get('video_path'):
-                break
-            print(f"  Download attempt {dl_attempt}/{MAX_DOWNLOAD_RETRIES} failed")
-            if dl_attempt < MAX_DOWNLOAD_RETRIES:
-                time.sleep(10)
-
-        if not media_info or not media_info.get('video_path'):
-            print(f"  Download permanently failed!")
-            notify_upload_failed(title, "Rumble", "Download failed (all methods)", i, total)
-            failed_count += 1
-            continue
-
-        video_path = media_info['video_path']
-        actual_title = media_info.get('title') or title
-        description = media_info.get('description', '')
-
-        # --- Upload to Rumble (retries are inside upload_to_rumble) ---
+    def upload(video_path, title, description, media_info):
+        # Retries are inside upload_to_rumble
         tags = ['sermon', 'church', 'daghewardmills']
-        success = upload_to_rumble(video_path, actual_title, description, tags)
-
-        if success:
-            uploaded_count += 1
-
-            # Mark as done
-            with open(RUMBLE_ARCHIVE, 'a') as f:
-                f.write(f"{vid_id}\n")
-
-            # Update Google Sheet
-            update_sheet_platform(video_url, actual_title, "Rumble", "Uploaded", "", year=YEAR)
-            notify_upload_success(actual_title, "Rumble", uploaded_count, total)
-        else:
-            failed_count += 1
-            notify_upload_failed(actual_title, "Rumble", "Upload failed", i, total)
-
-        # --- Clean up downloaded file ---
-        if os.path.exists(video_path):
-            os.remove(video_path)
-            print(f"  Cleaned up: {video_path}")
-
-        # Also clean up any metadata files
-        base_path = os.path.splitext(video_path)[0]
-        for ext in ['.info.json', '.jpg', '.webp', '.png']:
-            meta_file = base_path + ext
-            if os.path.exists(meta_file):
-                os.remove(meta_file)
+        return upload_to_rumble(video_path, title, description, tags), ""
+
+    uploaded_count, failed_count = run_uploads(entries, done_ids, "Rumble", YEAR, RUMBLE_ARCHIVE, RUMBLE_SHA256, upload)
 
     # --- Final summary ---
     summary = (
@@ -0,0 +1,119 @@
+"""
+Sheet writer sidecar.
+
+Holds a single authenticated gspread session (plus the worksheet cache in
+notifier.py) for every runner on this host. Runners POST their updates to
+http://127.0.0.1:SHEET_WRITER_PORT/update via notifier.update_sheet_platform
+and return immediately; one background thread writes them in batches.
+
+If this daemon isn't running, the runners fall back to writing the sheet
+themselves.
+
+Usage:
+    python3 sheet_writer_daemon.py
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from config import SHEET_WRITER_PORT
+from notifier import write_sheet_updates, SHEET_BATCH_SIZE
+
+UPDATE_FIELDS = ('video_url', 'title', 'platform', 'status', 'link', 'year')
+
+# Seconds to keep collecting updates before writing a partial batch
+FLUSH_INTERVAL = 30
+
+_updates = queue.Queue()
+
+
+def _writer_loop():
+    """
+    Apply queued sheet updates in batches of up to SHEET_BATCH_SIZE, until a
+    None in the queue says to write what's left and stop.
+    """
+    while True:
+        update = _updates.get()
+        if update is None:
+            return
+        batch = [update]
+        stopping = False
+        deadline = time.monotonic() + FLUSH_INTERVAL
+        while len(batch) < SHEET_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                update = _updates.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if update is None:
+                stopping = True
+                break
+            batch.append(update)
+        try:
+            write_sheet_updates(batch)
+        except Exception as e:
+            print(f"Sheet update failed: {e}")
+        if stopping:
+            return
+
+
+class UpdateHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path != '/update':
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            data = json.loads(self.rfile.read(length))
+            update = {k: data.get(k, '') for k in UPDATE_FIELDS}
+        except (ValueError, TypeError, AttributeError):
+            self.send_response(400)
+            self.end_headers()
+            return
+
+        _updates.put(update)
+        self.send_response(202)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass  # Keep stdout for sheet update logs
+
+
+def main():
+    writer = threading.Thread(target=_writer_loop, daemon=True)
+    writer.start()
+    server = ThreadingHTTPServer(('127.0.0.1', SHEET_WRITER_PORT), UpdateHandler)
+    # Join request threads on close, so every accepted update is queued
+    # before the final drain
+    server.daemon_threads = False
+
+    # Updates are acknowledged (202) before they are written, so a SIGTERM
+    # stops the server and writes out the queue instead of dropping it.
+    # shutdown() waits for serve_forever, so it can't run in this thread.
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+
+    print(f"Sheet writer listening on 127.0.0.1:{SHEET_WRITER_PORT}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+    print("Sheet writer stopping, writing queued updates ...")
+    _updates.put(None)
+    writer.join()
+
+
+if __name__ == "__main__":
+    main()
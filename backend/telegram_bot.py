@@ -18,6 +18,7 @@ Commands the user can send:
 import os
 import sys
 import re
+import time
 import gspread
 import asyncio
 from telegram import Update
@@ -29,25 +30,64 @@ from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, GOOGLE_SHEET_URL
 # Google Sheets client
 CREDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "google_credentials.json")
 
+# The spreadsheet handle is reused for SHEET_TTL seconds, and replies are
+# reused for RESPONSE_TTL seconds per message text ("refresh" bypasses both)
+SHEET_TTL = 600
+RESPONSE_TTL = 30
+
+_sheet_cache = None  # (opened_at, spreadsheet)
+_response_cache = {}  # text -> (built_at, response)
+
 def get_sheet():
+    global _sheet_cache
+    if _sheet_cache and time.time() - _sheet_cache[0] < SHEET_TTL:
+        return _sheet_cache[1]
     gc = gspread.service_account(filename=CREDS_PATH)
-    return gc.open_by_url(GOOGLE_SHEET_URL)
+    sh = gc.open_by_url(GOOGLE_SHEET_URL)
+    _sheet_cache = (time.time(), sh)
+    return sh
+
+# The bot only needs Name and the platform status columns, which all sit in
+# B:I (see notifier.HEADERS). Columns are located by their header in row 1.
+STATUS_COLUMNS = "B:I"
+
+def _fetch_tabs(sh, titles):
+    """
+    Read STATUS_COLUMNS of several tabs with one values_batch_get call.
+    Returns {title: (column index by header, data rows)}.
+    """
+    ranges = [f"'{t}'!{STATUS_COLUMNS}" for t in titles]
+    value_ranges = sh.values_batch_get(ranges).get("valueRanges", [])
+    tabs = {}
+    for title, vr in zip(titles, value_ranges):
+        values = vr.get("values", [])
+        header = values[0] if values else []
+        tabs[title] = ({name: i for i, name in enumerate(header)}, values[1:])
+    return tabs
+
+def _column(cols, rows, name):
+    """Values of the column headed `name`; rows trimmed by the API read as ''."""
+    i = cols.get(name)
+    if i is None:
+        return [""] * len(rows)
+    return [row[i] if i < len(row) else "" for row in rows]
 
 def get_year_status(year_str):
     """Get status summary for a specific year."""
     try:
         sh = get_sheet()
-        ws = sh.worksheet(year_str)
-        records = ws.get_all_records()
-        total = len(records)
+        cols, rows = _fetch_tabs(sh, [year_str])[year_str]
+        total = len(rows)
         if total == 0:
             return f"📋 Year {year_str}: No videos found yet."
         
-        yt_done = sum(1 for r in records if r.get("YouTube Status") == "Uploaded")
-        bc_done = sum(1 for r in records if r.get("Bitchute Status") == "Uploaded")
-        dm_done = sum(1 for r in records if r.get("Dailymotion Status") == "Uploaded")
-        bc_fail = sum(1 for r in records if r.get("Bitchute Status") == "Failed")
-        dm_fail = sum(1 for r in records if r.get("Dailymotion Status") == "Failed")
+        bc_status = _column(cols, rows, "Bitchute Status")
+        dm_status = _column(cols, rows, "Dailymotion Status")
+        yt_done = _column(cols, rows, "YouTube Status").count("Uploaded")
+        bc_done = bc_status.count("Uploaded")
+        dm_done = dm_status.count("Uploaded")
+        bc_fail = bc_status.count("Failed")
+        dm_fail = dm_status.count("Failed")
         
         msg = f"📊 <b>Year {year_str} Status</b>\n"
         msg += f"━━━━━━━━━━━━━━━\n"
@@ -69,8 +109,10 @@ def get_year_status(year_str):
             msg += f"\n🏆 Overall: <b>{pct}%</b> complete"
         
         return msg
-    except gspread.exceptions.WorksheetNotFound:
-        return f"❌ No data for year {year_str} yet."
+    except gspread.exceptions.APIError as e:
+        if "Unable to parse range" in str(e):  # No tab for this year
+            return f"❌ No data for year {year_str} yet."
+        return f"⚠️ Error reading sheet: {str(e)[:100]}"
     except Exception as e:
         return f"⚠️ Error reading sheet: {str(e)[:100]}"
 
@@ -79,9 +121,9 @@ def get_overall_status():
     try:
         sh = get_sheet()
         worksheets = sh.worksheets()
-        year_tabs = [ws for ws in worksheets if ws.title.isdigit() and len(ws.title) == 4]
+        year_titles = sorted(ws.title for ws in worksheets if ws.title.isdigit() and len(ws.title) == 4)
         
-        if not year_tabs:
+        if not year_titles:
             return "📋 No year tabs found yet."
         
         msg = "📊 <b>Archive Overview</b>\n━━━━━━━━━━━━━━━\n"
@@ -89,17 +131,19 @@ def get_overall_status():
         bc_all = 0
         dm_all = 0
         
-        for ws in sorted(year_tabs, key=lambda w: w.title):
-            records = ws.get_all_records()
-            total = len(records)
+        # All year tabs in a single request
+        tabs = _fetch_tabs(sh, year_titles)
+        for title in year_titles:
+            cols, rows = tabs[title]
+            total = len(rows)
             if total == 0:
                 continue
             total_all += total
-            bc = sum(1 for r in records if r.get("Bitchute Status") == "Uploaded")
-            dm = sum(1 for r in records if r.get("Dailymotion Status") == "Uploaded")
+            bc = _column(cols, rows, "Bitchute Status").count("Uploaded")
+            dm = _column(cols, rows, "Dailymotion Status").count("Uploaded")
             bc_all += bc
             dm_all += dm
-            msg += f"\n<b>{ws.title}</b>: 📺{total} | 🔴BC {bc}/{total} | 🔵DM {dm}/{total}"
+            msg += f"\n<b>{title}</b>: 📺{total} | 🔴BC {bc}/{total} | 🔵DM {dm}/{total}"
         
         msg += f"\n\n━━━━━━━━━━━━━━━"
         msg += f"\n<b>TOTALS</b>: {total_all} videos"
@@ -115,20 +159,22 @@ def get_completed_list(year_str=None, platform=None):
     try:
         sh = get_sheet()
         if year_str:
-            tabs = [sh.worksheet(year_str)]
+            titles = [year_str]
         else:
-            tabs = [ws for ws in sh.worksheets() if ws.title.isdigit() and len(ws.title) == 4]
+            titles = [ws.title for ws in sh.worksheets() if ws.title.isdigit() and len(ws.title) == 4]
         
         completed = []
-        for ws in tabs:
-            records = ws.get_all_records()
-            for r in records:
-                if platform == "bitchute" and r.get("Bitchute Status") == "Uploaded":
-                    completed.append(f"✅ {r.get('Name', '?')}")
-                elif platform == "dailymotion" and r.get("Dailymotion Status") == "Uploaded":
-                    completed.append(f"✅ {r.get('Name', '?')}")
-                elif not platform and (r.get("Bitchute Status") == "Uploaded" or r.get("Dailymotion Status") == "Uploaded"):
-                    completed.append(f"✅ {r.get('Name', '?')}")
+        for cols, rows in _fetch_tabs(sh, titles).values():
+            names = _column(cols, rows, "Name")
+            bc_status = _column(cols, rows, "Bitchute Status")
+            dm_status = _column(cols, rows, "Dailymotion Status")
+            for name, bc, dm in zip(names, bc_status, dm_status):
+                if platform == "bitchute" and bc == "Uploaded":
+                    completed.append(f"✅ {name or '?'}")
+                elif platform == "dailymotion" and dm == "Uploaded":
+                    completed.append(f"✅ {name or '?'}")
+                elif not platform and (bc == "Uploaded" or dm == "Uploaded"):
+                    completed.append(f"✅ {name or '?'}")
         
         if not completed:
             return "No completed uploads found."
@@ -144,19 +190,24 @@ def get_completed_list(year_str=None, platform=None):
     except Exception as e:
         return f"⚠️ Error: {str(e)[:100]}"
 
-async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle incoming messages with natural language understanding."""
-    text = update.message.text.lower().strip()
-    
+# Message routing patterns, compiled once. Keywords match as substrings,
+# like the `w in text` checks they replace.
+YEAR_RE = re.compile(r'\b(199\d|200\d|201\d|202[0-6])\b')
+STATUS_KW = re.compile(r'status|update|how|progress|overview|where')
+LIST_KW = re.compile(r'list|done|completed|finished|which')
+HELP_KW = re.compile(r'help|command|what can')
+
+def build_response(text):
+    """Route a lower-cased message to the matching status reply."""
     # Check for year number
-    year_match = re.search(r'\b(199\d|200\d|201\d|202[0-6])\b', text)
+    year_match = YEAR_RE.search(text)
     
-    if any(w in text for w in ['status', 'update', 'how', 'progress', 'overview', 'where']):
+    if STATUS_KW.search(text):
         if year_match:
             response = get_year_status(year_match.group(1))
         else:
             response = get_overall_status()
-    elif any(w in text for w in ['list', 'done', 'completed', 'finished', 'which']):
+    elif LIST_KW.search(text):
         platform = None
         if 'bitchute' in text or 'bc' in text:
             platform = "bitchute"
@@ -176,7 +227,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             response = get_overall_status()
     elif year_match:
         response = get_year_status(year_match.group(1))
-    elif any(w in text for w in ['help', 'command', 'what can']):
+    elif HELP_KW.search(text):
         response = (
             "🤖 <b>I understand these:</b>\n"
             "• <b>status</b> — Overall progress\n"
@@ -184,12 +235,38 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "• <b>list</b> — Completed videos\n"
             "• <b>list bitchute 1999</b> — Platform+year filter\n"
             "• <b>dailymotion status</b> — Platform status\n"
+            "• <b>refresh</b> — Re-read the sheet instead of the 30s cache\n"
             "• <b>help</b> — This message"
         )
     else:
         # Default: show overall status
         response = get_overall_status()
     
+    return response
+
+async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle incoming messages with natural language understanding."""
+    global _sheet_cache
+    text = update.message.text.lower().strip()
+    
+    if 'refresh' in text:
+        _sheet_cache = None
+        _response_cache.clear()
+    
+    now = time.time()
+    cached = _response_cache.get(text)
+    if cached and now - cached[0] < RESPONSE_TTL:
+        response = cached[1]
+    else:
+        # Sheets reads block; run them off the event loop so other chats
+        # aren't stalled behind this one
+        response = await asyncio.to_thread(build_response, text)
+        # Drop expired replies so arbitrary chat text can't grow the cache
+        for key in [k for k, (t, _) in _response_cache.items() if now - t >= RESPONSE_TTL]:
+            del _response_cache[key]
+        if not response.startswith("⚠️"):  # Don't hold on to errors
+            _response_cache[text] = (time.time(), response)
+    
     await update.message.reply_text(response, parse_mode="HTML")
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -18,8 +18,10 @@ import os
 import re
 import time
 import json
+import shutil
 import subprocess
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 # ---------------------------------------------------------------------------
 # Configuration
@@ -27,6 +29,16 @@ import tempfile
 MAX_RETRIES = 3
 RETRY_DELAY = 30  # seconds between retries
 
+# Abort a video upload that stays below UPLOAD_STALL_BYTES/s for
+# UPLOAD_STALL_SECONDS instead of sitting out the full upload timeout.
+# curl keeps this check running after the body is sent, while it waits for
+# process_video to answer, so the window must outlast BitChute's slowest
+# acknowledgement of a large file: aborting a finished upload means sending
+# it again (and possibly a duplicate). A dead link therefore costs up to
+# 10 minutes, not 2 hours.
+UPLOAD_STALL_BYTES = 1024
+UPLOAD_STALL_SECONDS = 600
+
 # Token file stores the Bearer token extracted from Chrome localStorage
 TOKEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bitchute_token.json')
 
@@ -37,6 +49,10 @@ USER_AGENT = (
     'Chrome/131.0.0.0 Safari/537.36'
 )
 
+# Scraped from the upload page on every upload
+_CSRF_RE = re.compile(r'csrfmiddlewaretoken[^a-zA-Z]*([a-zA-Z0-9]{20,})')
+_KEY_RE = re.compile(r"'key'\s*:\s*'([^']+)'")
+
 
 # ---------------------------------------------------------------------------
 # Token management
@@ -72,17 +88,71 @@ def save_token(access_token, channel_id):
 
 FFMPEG_PATH = '/tmp/ffmpeg'
 
+# Thumbnail formats BitChute accepts as-is (no conversion needed), by file
+# signature: JPEG and PNG, with the extension each is uploaded under
+_UPLOADABLE_THUMB_MAGIC = ((b'\xff\xd8\xff', '.jpg'), (b'\x89PNG', '.png'))
+
+
+def _uploadable_thumbnail_ext(thumb_path):
+    """'.jpg' or '.png' if the file's header says it is already a JPEG or PNG, whatever its extension; else None."""
+    with open(thumb_path, 'rb') as f:
+        header = f.read(8)
+    for magic, ext in _UPLOADABLE_THUMB_MAGIC:
+        if header.startswith(magic):
+            return ext
+    return None
+
 
 def _convert_thumbnail_to_jpeg(thumb_path):
     """Convert a WebP thumbnail to JPEG for BitChute compatibility."""
     if not thumb_path or not os.path.exists(thumb_path):
         return None
-    if thumb_path.lower().endswith(('.jpg', '.jpeg', '.png')):
-        return thumb_path
+    base, ext = os.path.splitext(thumb_path)
+    real_ext = _uploadable_thumbnail_ext(thumb_path)
+    if real_ext:
+        if ext.lower() == real_ext or (real_ext == '.jpg' and ext.lower() == '.jpeg'):
+            return thumb_path
+        # Right format, wrong name: the upload's filename and MIME type come
+        # from the extension, so give it the one its contents match
+        fixed_path = base + real_ext
+        shutil.copyfile(thumb_path, fixed_path)
+        return fixed_path
+    jpeg_path = os.path.splitext(thumb_path)[0] + '.jpg'
+    src_path = thumb_path
+    if src_path == jpeg_path:
+        # Not really a JPEG despite its name; move it aside so the
+        # conversion doesn't write over its own input
+        src_path = os.path.splitext(thumb_path)[0] + '.webp'
+        os.replace(thumb_path, src_path)
+    # libvips (if installed) decodes and encodes sequentially with SIMD;
+    # the stripped, optimized JPEG is also smaller to upload
+    try:
+        import pyvips
+        img = pyvips.Image.new_from_file(src_path, access='sequential')
+        img.jpegsave(jpeg_path, Q=90, optimize_coding=True, strip=True)
+        print(f"  Converted thumbnail to JPEG: {jpeg_path}")
+        return jpeg_path
+    except ImportError:
+        pass
+    except Exception as e:
+        print(f"  pyvips conversion failed: {e}")
+    # Otherwise one ffmpeg call (libavcodec's SIMD decoder/encoder)
+    if os.path.exists(FFMPEG_PATH):
+        try:
+            result = subprocess.run(
+                [FFMPEG_PATH, '-y', '-i', src_path, '-q:v', '2', jpeg_path],
+                capture_output=True, text=True, timeout=30
+            )
+            if result.returncode == 0 and os.path.exists(jpeg_path):
+                print(f"  Converted thumbnail to JPEG: {jpeg_path}")
+                return jpeg_path
+            print(f"  ffmpeg conversion failed: {result.stderr[-200:]}")
+        except Exception as e:
+            print(f"  ffmpeg conversion failed: {e}")
+    # PIL as the last resort
     try:
         from PIL import Image
-        jpeg_path = os.path.splitext(thumb_path)[0] + '.jpg'
-        img = Image.open(thumb_path).convert('RGB')
+        img = Image.open(src_path).convert('RGB')
         img.save(jpeg_path, 'JPEG', quality=90)
         print(f"  Converted thumbnail to JPEG: {jpeg_path}")
         return jpeg_path
@@ -93,43 +163,59 @@ def _convert_thumbnail_to_jpeg(thumb_path):
 
 def _generate_thumbnail_from_video(video_path):
     """Extract a frame from the video at ~10% of duration as a JPEG thumbnail."""
+    thumb_path = os.path.splitext(video_path)[0] + '_thumb.jpg'
+    start_path = os.path.splitext(video_path)[0] + '_thumb0.jpg'
     try:
-        thumb_path = os.path.splitext(video_path)[0] + '_thumb.jpg'
-        # Extract a frame at 5 seconds (or 10% of short videos)
+        # One ffmpeg pass writes both candidates: the first frame at or after
+        # 5 seconds, and the very first frame for clips shorter than that
         cmd = [
             FFMPEG_PATH, '-y',
-            '-ss', '5',  # Seek to 5 seconds
+            '-skip_frame', 'nokey',  # Decode keyframes only; both picks are keyframes
             '-i', video_path,
-            '-vframes', '1',
-            '-q:v', '2',  # High quality JPEG
-            '-vf', 'scale=1280:-2',  # Scale to 1280px wide, maintain aspect
-            thumb_path
+            '-an', '-sn', '-dn',  # Video only; don't decode audio/subtitles
+            '-filter_complex',
+            "[0:v]split=2[a][b];"
+            "[a]select='gte(t,5)',scale=1280:-2[later];"  # Scale to 1280px wide, maintain aspect
+            "[b]scale=1280:-2[first]",
+            '-map', '[later]', '-frames:v', '1', '-q:v', '2', thumb_path,  # High quality JPEG
+            '-map', '[first]', '-frames:v', '1', '-q:v', '2', start_path,
         ]
         result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        if result.returncode == 0 and os.path.exists(thumb_path):
-            size = os.path.getsize(thumb_path)
-            if size > 1000:  # At least 1KB
-                print(f"  [BitChute] Auto-generated thumbnail ({size / 1024:.0f} KB)")
-                return thumb_path
-            else:
-                os.remove(thumb_path)
-        # If seeking to 5s failed, try at 0s
-        cmd[3] = '0'
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        if result.returncode == 0 and os.path.exists(thumb_path):
-            size = os.path.getsize(thumb_path)
-            if size > 1000:
-                print(f"  [BitChute] Auto-generated thumbnail from start ({size / 1024:.0f} KB)")
-                return thumb_path
+        if result.returncode == 0:
+            for path, label in ((thumb_path, ''), (start_path, ' from start')):
+                if os.path.exists(path):
+                    size = os.path.getsize(path)
+                    if size > 1000:  # At least 1KB
+                        if path != thumb_path:
+                            os.replace(path, thumb_path)
+                        print(f"  [BitChute] Auto-generated thumbnail{label} ({size / 1024:.0f} KB)")
+                        return thumb_path
+        if os.path.exists(thumb_path):
+            os.remove(thumb_path)
         return None
     except Exception as e:
         print(f"  [BitChute] Thumbnail generation failed: {e}")
         return None
+    finally:
+        if os.path.exists(start_path):
+            os.remove(start_path)
 
 
 # ---------------------------------------------------------------------------
 # API helpers (using curl to avoid Python SSL issues)
 # ---------------------------------------------------------------------------
+def _run_curl(cmd, timeout):
+    """Run a curl command built with the __HTTP_CODE__ write-out. Returns (status, body)."""
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    body, sep, code = result.stdout.rpartition('\n__HTTP_CODE__')
+    if not sep:
+        return 0, result.stdout
+    try:
+        return int(code.strip()), body
+    except ValueError:
+        return 0, body
+
+
 def _api_post_json(url, token, payload, timeout=30):
     """POST JSON to BitChute API with Bearer token. Returns (status, dict)."""
     cmd = [
@@ -143,18 +229,7 @@ def _api_post_json(url, token, payload, timeout=30):
         url
     ]
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
-        output = result.stdout
-        if '__HTTP_CODE__' in output:
-            parts = output.rsplit('__HTTP_CODE__', 1)
-            body = parts[0].rstrip('\n')
-            try:
-                status = int(parts[1].strip())
-            except ValueError:
-                status = 0
-        else:
-            body = output
-            status = 0
+        status, body = _run_curl(cmd, timeout)
         try:
             data = json.loads(body)
         except:
@@ -178,19 +253,7 @@ def _curl_get(url, cookie_jar=None, timeout=30):
         cmd.extend(['-c', cookie_jar])
     cmd.append(url)
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
-        output = result.stdout
-        if '__HTTP_CODE__' in output:
-            parts = output.rsplit('__HTTP_CODE__', 1)
-            body = parts[0].rstrip('\n')
-            try:
-                status = int(parts[1].strip())
-            except ValueError:
-                status = 0
-        else:
-            body = output
-            status = 0
-        return status, body
+        return _run_curl(cmd, timeout)
     except Exception as e:
         return 0, str(e)
 
@@ -217,7 +280,10 @@ def _curl_upload_file(url, file_path, video_id, channel_id, upload_page_url='',
         field_name = "thumbnailInput"
 
     # Determine MIME type
-    mime_type = 'video/mp4' if is_video else 'image/jpeg'
+    if is_video:
+        mime_type = 'video/mp4'
+    else:
+        mime_type = 'image/png' if ext == '.png' else 'image/jpeg'
 
     cmd = [
         'curl', '-sS',
@@ -229,22 +295,14 @@ def _curl_upload_file(url, file_path, video_id, channel_id, upload_page_url='',
         '-H', f'Origin: {url.split("/videos/")[0]}',
         '-H', f'Referer: {upload_page_url or url}',
         '-F', f'{field_name}=@{file_path};filename={filepond_name};type={mime_type}',
-        url
+        '--connect-timeout', '30',
     ]
+    if is_video:
+        # The thumbnail's 120s timeout is already shorter than the stall window
+        cmd.extend(['--speed-limit', str(UPLOAD_STALL_BYTES), '--speed-time', str(UPLOAD_STALL_SECONDS)])
+    cmd.append(url)
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
-        output = result.stdout
-        if '__HTTP_CODE__' in output:
-            parts = output.rsplit('__HTTP_CODE__', 1)
-            body = parts[0].rstrip('\n')
-            try:
-                status = int(parts[1].strip())
-            except ValueError:
-                status = 0
-        else:
-            body = output
-            status = 0
-        return status, body
+        return _run_curl(cmd, timeout)
     except subprocess.TimeoutExpired:
         return 0, 'timeout'
     except Exception as e:
@@ -271,19 +329,7 @@ def _curl_post_form(url, form_data, cookie_jar=None, referer=None, timeout=60):
     cmd.append(url)
 
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
-        output = result.stdout
-        if '__HTTP_CODE__' in output:
-            parts = output.rsplit('__HTTP_CODE__', 1)
-            body = parts[0].rstrip('\n')
-            try:
-                status = int(parts[1].strip())
-            except ValueError:
-                status = 0
-        else:
-            body = output
-            status = 0
-        return status, body
+        return _run_curl(cmd, timeout)
     except Exception as e:
         return 0, str(e)
 
@@ -291,7 +337,7 @@ def _curl_post_form(url, form_data, cookie_jar=None, referer=None, timeout=60):
 # ---------------------------------------------------------------------------
 # Upload pipeline
 # ---------------------------------------------------------------------------
-def _do_upload(token, channel_id, video_path, title, description, thumb_to_use):
+def _do_upload(token, channel_id, video_path, file_size, title, description, thumb_to_use):
     """
     Full upload pipeline using BitChute API + curl.
     Returns True on success.
@@ -300,15 +346,15 @@ def _do_upload(token, channel_id, video_path, title, description, thumb_to_use):
     cookie_jar = tempfile.mktemp(suffix='_bc_cookies.txt')
 
     try:
-        return _do_upload_inner(token, channel_id, video_path, title, description, thumb_to_use, cookie_jar)
+        return _do_upload_inner(token, channel_id, video_path, file_size, title, description, thumb_to_use, cookie_jar)
     finally:
         # Clean up cookie jar
         if os.path.exists(cookie_jar):
             os.remove(cookie_jar)
 
 
-def _do_upload_inner(token, channel_id, video_path, title, description, thumb_to_use, cookie_jar):
-    """Inner upload logic with cookie jar."""
+def _do_upload_inner(token, channel_id, video_path, file_size, title, description, thumb_to_use, cookie_jar):
+    """Inner upload logic with cookie jar. file_size is the video's size as stat'ed by the caller."""
 
     # --- Step 1: Create new video slot ---
     print("  [BitChute] Step 1: Creating video slot...")
@@ -352,7 +398,7 @@ def _do_upload_inner(token, channel_id, video_path, title, description, thumb_to
         print(f"  [BitChute] Failed to load upload page: status={status}")
         return False
 
-    csrf_match = re.search(r'csrfmiddlewaretoken[^a-zA-Z]*([a-zA-Z0-9]{20,})', page_html)
+    csrf_match = _CSRF_RE.search(page_html)
     if not csrf_match:
         print("  [BitChute] Could not extract CSRF token from upload page")
         return False
@@ -361,40 +407,51 @@ def _do_upload_inner(token, channel_id, video_path, title, description, thumb_to
     print(f"  [BitChute] CSRF token obtained")
 
     # Extract the key value from the page (may differ from URL-encoded version)
-    key_match = re.search(r"'key'\s*:\s*'([^']+)'", page_html)
+    key_match = _KEY_RE.search(page_html)
     page_key = key_match.group(1) if key_match else auth_key
 
-    # --- Step 4: Upload video file ---
-    file_size = os.path.getsize(video_path)
+    # --- Steps 4+5: Upload video and thumbnail ---
+    # The two files go to separate endpoints and don't depend on each other,
+    # so the small thumbnail upload runs alongside the video instead of after it
+    has_thumb = thumb_to_use and os.path.exists(thumb_to_use)
     print(f"  [BitChute] Step 4: Uploading video ({file_size / 1024 / 1024:.1f} MB)...")
+    if has_thumb:
+        print(f"  [BitChute] Step 5: Uploading thumbnail...")
+    else:
+        print(f"  [BitChute] Step 5: No thumbnail available, skipping")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        video_future = pool.submit(
+            _curl_upload_file,
+            f"{upload_base}process_video", video_path, video_id, channel_id,
+            upload_page_url=upload_page_url, is_video=True,
+            timeout=7200  # 2 hours for large files
+        )
+        thumb_future = None
+        if has_thumb:
+            thumb_future = pool.submit(
+                _curl_upload_file,
+                f"{upload_base}process_thumbnail", thumb_to_use, video_id, channel_id,
+                upload_page_url=upload_page_url, is_video=False,
+                timeout=120
+            )
+
+        # Both uploads must be done before finish_upload
+        status, body = video_future.result()
+        if thumb_future:
+            thumb_status, _ = thumb_future.result()
 
-    process_video_url = f"{upload_base}process_video"
-    status, body = _curl_upload_file(
-        process_video_url, video_path, video_id, channel_id,
-        upload_page_url=upload_page_url, is_video=True,
-        timeout=7200  # 2 hours for large files
-    )
     if status != 200:
         print(f"  [BitChute] Video upload failed: status={status} body={body[:200]}")
         return False
 
     print(f"  [BitChute] Video uploaded successfully")
 
-    # --- Step 5: Upload thumbnail ---
-    if thumb_to_use and os.path.exists(thumb_to_use):
-        print(f"  [BitChute] Step 5: Uploading thumbnail...")
-        process_thumb_url = f"{upload_base}process_thumbnail"
-        status, body = _curl_upload_file(
-            process_thumb_url, thumb_to_use, video_id, channel_id,
-            upload_page_url=upload_page_url, is_video=False,
-            timeout=120
-        )
-        if status == 200:
+    if thumb_future:
+        if thumb_status == 200:
             print(f"  [BitChute] Thumbnail uploaded")
         else:
-            print(f"  [BitChute] Thumbnail upload failed (non-fatal): status={status}")
-    else:
-        print(f"  [BitChute] Step 5: No thumbnail available, skipping")
+            print(f"  [BitChute] Thumbnail upload failed (non-fatal): status={thumb_status}")
 
     # --- Step 6: Finish upload (submit metadata) ---
     print(f"  [BitChute] Step 6: Submitting metadata...")
@@ -448,11 +505,13 @@ def upload_to_bitchute(video_path, title, description, thumbnail_path=None):
 
     Returns True on success, False on failure.
     """
-    if not os.path.exists(video_path):
+    # One stat for the existence check and the size used by every attempt
+    try:
+        file_size = os.stat(video_path).st_size
+    except FileNotFoundError:
         print(f"[BitChute] Video file not found: {video_path}")
         return False
 
-    file_size = os.path.getsize(video_path)
     if file_size < 1000:
         print(f"[BitChute] File too small ({file_size} bytes)")
         return False
@@ -484,7 +543,7 @@ def upload_to_bitchute(video_path, title, description, thumbnail_path=None):
         try:
             success = _do_upload(
                 token, channel_id,
-                video_path, title, description, thumb_to_use
+                video_path, file_size, title, description, thumb_to_use
             )
 
             if success:
@@ -1,19 +1,91 @@
 import os
 import time
+import random
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from email.utils import parsedate_to_datetime
 from config import DAILYMOTION_USERNAME, DAILYMOTION_PASSWORD, DAILYMOTION_API_KEY, DAILYMOTION_API_SECRET, DAILYMOTION_REFRESH_TOKEN
 
 # Retry configuration
 MAX_UPLOAD_RETRIES = 3
-RETRY_BASE_DELAY = 30  # seconds — retries at 30s, 60s, 120s
+RETRY_BASE_DELAY = 30  # seconds — retries at ~30s, 60s, 120s (+0-50% jitter)
+MAX_BACKOFF = 600  # cap on any single retry wait, including a 429's Retry-After
+
+# HTTP statuses worth retrying; any other error status fails the upload at once
+_TRANSIENT_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# Pause used when the daily limit response carries no usable Retry-After
+RATE_LIMIT_PAUSE = 24 * 60 * 60
+
+# Access tokens are reused until this long before they expire, so a token
+# never runs out during the longest upload (7200s) plus publishing
+TOKEN_REFRESH_MARGIN = 2 * 60 * 60 + 300
+
+_token_cache = None  # (access_token, reuse_until)
+
+# One keep-alive session for every call, so auth, upload URL and publish reuse
+# the api.dailymotion.com connection. The adapter only absorbs cheap blips:
+# failed connects (nothing sent yet) and gateway errors on the upload-URL GET.
+# Anything else goes to upload_to_dailymotion's loop, which restarts the whole
+# auth -> upload URL -> upload -> publish sequence; a half-sent multi-GB POST
+# can't be replayed from inside urllib3.
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=4, pool_maxsize=8,
+    max_retries=Retry(total=3, connect=2, read=0, status=2, backoff_factor=1,
+                      status_forcelist=[502, 503, 504], allowed_methods=['GET'],
+                      respect_retry_after_header=True, raise_on_status=False),
+))
+
+
+def _parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), capped at 24h."""
+    if not value:
+        return RATE_LIMIT_PAUSE
+    try:
+        seconds = int(value)
+    except ValueError:
+        try:
+            seconds = int(parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return RATE_LIMIT_PAUSE
+    return min(max(seconds, 0), RATE_LIMIT_PAUSE)
+
+
+def _retry_delay(attempt, response=None):
+    """
+    Seconds to wait before the next attempt: the server's Retry-After on a
+    429, else exponential backoff with jitter. Both are capped at MAX_BACKOFF.
+    """
+    if response is not None and response.status_code == 429:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after:
+            return min(_parse_retry_after(retry_after), MAX_BACKOFF)
+    delay = RETRY_BASE_DELAY * (2 ** (attempt - 1)) * (1 + random.uniform(0, 0.5))
+    return min(delay, MAX_BACKOFF)
+
+
+def _cache_token(token_data):
+    """Remember an OAuth token response's access token for reuse; returns the token."""
+    global _token_cache
+    token = token_data.get('access_token')
+    if token:
+        expires_in = int(token_data.get('expires_in') or 0)
+        _token_cache = (token, time.time() + expires_in - TOKEN_REFRESH_MARGIN)
+    return token
 
 
 def authenticate():
     """
     Authenticate with Dailymotion API to get an access token.
-    Uses refresh_token (from authorization code flow) if available,
-    otherwise falls back to password grant (deprecated).
+    Reuses the last token while it has TOKEN_REFRESH_MARGIN left; otherwise
+    uses refresh_token (from authorization code flow) if available,
+    falling back to password grant (deprecated).
     """
+    if _token_cache and time.time() < _token_cache[1]:
+        return _token_cache[0]
+
     auth_url = "https://api.dailymotion.com/oauth/token"
 
     # --- Attempt 1: Refresh token (preferred) ---
@@ -25,10 +97,9 @@ def authenticate():
             'refresh_token': DAILYMOTION_REFRESH_TOKEN,
         }
         try:
-            response = requests.post(auth_url, data=payload, timeout=30)
+            response = _session.post(auth_url, data=payload, timeout=30)
             if response.status_code == 200:
-                token_data = response.json()
-                token = token_data.get('access_token')
+                token = _cache_token(response.json())
                 if token:
                     print("[AUTH] Authenticated via refresh_token (OK)")
                     return token
@@ -51,10 +122,10 @@ def authenticate():
     }
 
     try:
-        response = requests.post(auth_url, data=payload, timeout=30)
+        response = _session.post(auth_url, data=payload, timeout=30)
         response.raise_for_status()
         token_data = response.json()
-        token = token_data.get('access_token')
+        token = _cache_token(token_data)
         if token:
             print("[AUTH] Authenticated via password grant (OK, but deprecated)")
             return token
@@ -75,23 +146,33 @@ def get_upload_url(access_token):
     """
     url = "https://api.dailymotion.com/file/upload"
     headers = {'Authorization': f'Bearer {access_token}'}
-    response = requests.get(url, headers=headers, timeout=30)
+    response = _session.get(url, headers=headers, timeout=30)
     response.raise_for_status()
     return response.json().get('upload_url')
 
 
-def upload_file(upload_url, video_path):
+def upload_file(upload_url, video_path, file_size=None):
     """
     Upload the video file to the given upload URL.
     Returns the uploaded file URL necessary for the next step.
     Uses a longer timeout since video files can be very large.
+    file_size (bytes) is only used for the progress line; stat'ed if omitted.
     """
-    file_size_mb = os.path.getsize(video_path) / (1024 * 1024)
-    print(f"  Uploading {file_size_mb:.1f} MB ...")
+    if file_size is None:
+        file_size = os.path.getsize(video_path)
+    print(f"  Uploading {file_size / (1024 * 1024):.1f} MB ...")
 
     with open(video_path, 'rb') as f:
+        # files= builds the whole multipart body in memory; MultipartEncoder
+        # (requests-toolbelt, if installed) streams it from the file instead
+        try:
+            from requests_toolbelt.multipart.encoder import MultipartEncoder
+            body = MultipartEncoder(fields={'file': (os.path.basename(video_path), f, 'video/mp4')})
+            kwargs = {'data': body, 'headers': {'Content-Type': body.content_type}}
+        except ImportError:
+            kwargs = {'files': {'file': f}}
         # Allow up to 2 hours for very large files
-        response = requests.post(upload_url, files={'file': f}, timeout=7200)
+        response = _session.post(upload_url, timeout=7200, **kwargs)
         response.raise_for_status()
         return response.json().get('url')
 
@@ -116,7 +197,7 @@ def create_video(access_token, file_url, title, description, tags=None, private=
     if tags:
         payload['tags'] = ','.join(tags[:10])
 
-    response = requests.post(url, headers=headers, data=payload, timeout=60)
+    response = _session.post(url, headers=headers, data=payload, timeout=60)
     try:
         response.raise_for_status()
     except requests.exceptions.HTTPError as e:
@@ -124,7 +205,10 @@ def create_video(access_token, file_url, title, description, tags=None, private=
         try:
             error_data = e.response.json().get('error', {}).get('error_data', {})
             if error_data.get('reason') == 'upload_limit_exceeded':
-                return {"_internal_status": "RATE_LIMITED"}
+                return {
+                    "_internal_status": "RATE_LIMITED",
+                    "retry_after": _parse_retry_after(e.response.headers.get('Retry-After')),
+                }
         except:
             pass
         raise
@@ -135,33 +219,48 @@ def upload_to_dailymotion(video_path, title, description, tags=None):
     """
     Full pipeline to upload a video to Dailymotion.
 
-    - Gets a fresh token every attempt to avoid 403s from expired tokens.
-    - Retries up to MAX_UPLOAD_RETRIES times with exponential backoff on
-      transient failures (network errors, timeouts, 5xx responses).
-    - Returns the Dailymotion video ID on success, "RATE_LIMITED" if the
-      daily upload cap is hit, or None on permanent failure.
+    - Reuses a cached token while it is well within its lifetime; a 401/403
+      drops it and retries once straight away with a fresh one.
+    - Retries up to MAX_UPLOAD_RETRIES times with jittered exponential backoff
+      on transient failures (network errors, timeouts, _TRANSIENT_STATUS); a 429
+      waits for its Retry-After instead.
+    - Returns the Dailymotion video ID on success, ("RATE_LIMITED", seconds)
+      if the daily upload cap is hit (seconds from Retry-After, at most 24h),
+      or None on permanent failure.
     """
+    global _token_cache
     last_error = None
+    # Check the file before any OAuth/upload-URL round trips; the size is
+    # stat'ed once here rather than on every retry
+    try:
+        file_size = os.stat(video_path).st_size
+    except FileNotFoundError:
+        print(f"Dailymotion upload skipped, video file not found: {video_path}")
+        return None
+    if file_size == 0:
+        print(f"Dailymotion upload skipped, video file is empty: {video_path}")
+        return None
+    reauthenticated = False
 
     for attempt in range(1, MAX_UPLOAD_RETRIES + 1):
         try:
             prefix = f"[Attempt {attempt}/{MAX_UPLOAD_RETRIES}]"
 
             print(f"{prefix} Authenticating Dailymotion ...")
-            token = authenticate()  # Fresh token every attempt
+            token = authenticate()
 
             print(f"{prefix} Getting upload URL ...")
             upload_url = get_upload_url(token)
 
             print(f"{prefix} Uploading file {video_path} ...")
-            file_url = upload_file(upload_url, video_path)
+            file_url = upload_file(upload_url, video_path, file_size)
 
             print(f"{prefix} Publishing video ...")
             video_data = create_video(token, file_url, title, description, tags)
 
             if video_data.get("_internal_status") == "RATE_LIMITED":
                 print(f"{prefix} Dailymotion daily limit reached!")
-                return "RATE_LIMITED"
+                return ("RATE_LIMITED", video_data["retry_after"])
 
             dm_id = video_data.get('id')
             print(f"{prefix} Successfully uploaded to Dailymotion: {dm_id}")
@@ -173,23 +272,30 @@ def upload_to_dailymotion(video_path, title, description, tags=None):
             last_error = e
             status_code = getattr(getattr(e, 'response', None), 'status_code', None)
 
-            # Don't retry on 4xx errors (except 429 rate limit)
-            if status_code and 400 <= status_code < 500 and status_code != 429:
+            # A rejected token may just be stale: drop it and retry once now
+            if status_code in (401, 403) and not reauthenticated:
+                print(f"{prefix} Token rejected ({status_code}), re-authenticating ...")
+                _token_cache = None
+                reauthenticated = True
+                continue
+
+            # Only timeouts, rate limits and gateway/server hiccups are retried
+            if status_code and status_code not in _TRANSIENT_STATUS:
                 print(f"{prefix} Permanent HTTP error ({status_code}), not retrying: {e}")
                 break
 
-            delay = RETRY_BASE_DELAY * (2 ** (attempt - 1))  # 30s, 60s, 120s
+            delay = _retry_delay(attempt, getattr(e, 'response', None))
             print(f"{prefix} Transient error: {e}")
             if attempt < MAX_UPLOAD_RETRIES:
-                print(f"  Retrying in {delay}s ...")
+                print(f"  Retrying in {delay:.0f}s ...")
                 time.sleep(delay)
 
         except Exception as e:
             last_error = e
             print(f"{prefix} Unexpected error: {e}")
             if attempt < MAX_UPLOAD_RETRIES:
-                delay = RETRY_BASE_DELAY * (2 ** (attempt - 1))
-                print(f"  Retrying in {delay}s ...")
+                delay = _retry_delay(attempt)
+                print(f"  Retrying in {delay:.0f}s ...")
                 time.sleep(delay)
 
     print(f"Dailymotion upload permanently failed after {MAX_UPLOAD_RETRIES} attempts: {last_error}")
@@ -18,15 +18,27 @@ Auth token is saved to odysee_token.json after first successful login.
 import os
 import sys
 import json
+import base64
 import time
 import re
+import fcntl
 import requests
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
-MAX_RETRIES = 3
-RETRY_DELAY = 30
+# Whole-upload attempts; a failed PATCH is retried on its own first (below),
+# so only auth/publish failures or a dead upload slot start over
+MAX_RETRIES = 2
+RETRY_DELAY = 30  # seconds, doubled after each failed attempt
+
+# Retries of one TUS PATCH, waiting PATCH_RETRY_DELAY * 2^n seconds between
+PATCH_RETRIES = 5
+PATCH_RETRY_DELAY = 2
 
 ODYSEE_API = "https://api.odysee.com"
 ODYSEE_PROXY = "https://api.na-backend.odysee.com/api/v1/proxy"
@@ -37,36 +49,92 @@ TOKEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'odysee_to
 # Default bid amount in LBC (very small to conserve credits)
 DEFAULT_BID = "0.001"
 
-# Chunk size for TUS upload (5 MB)
+# Chunk size for TUS upload (5 MB). This is the starting size: each upload
+# then resizes its chunks so a PATCH takes about CHUNK_TARGET_SECONDS at the
+# measured throughput, within MIN/MAX_CHUNK_SIZE (fewer round trips on fast
+# links), and halves the size after a failed PATCH.
 CHUNK_SIZE = 5 * 1024 * 1024
+MIN_CHUNK_SIZE = 4 * 1024 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+CHUNK_TARGET_SECONDS = 5
+
+# Parallel TUS upload streams. Only used when the server supports the TUS
+# concatenation extension (plain TUS PATCHes must arrive in order); 1 keeps
+# uploads serial. 4-8 helps on high-latency links.
+TUS_CONCURRENCY = int(os.getenv('ODYSEE_TUS_CONCURRENCY', '1'))
+
+# One keep-alive session for every call, so the TUS PATCHes of one upload
+# (hundreds for a large file) share a connection instead of re-handshaking
+# each. Gateway errors are only retried for HEAD and GET. A failed PATCH is
+# resumed by _tus_patch_range from the server's offset (a blind resend could
+# hit a 409), and POSTs (slot create, publish) are left to the caller so a
+# publish is never sent twice.
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=4, pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=1, status_forcelist=[502, 503, 504],
+                      allowed_methods=["HEAD", "GET"], raise_on_status=False),
+))
 
 
 # ---------------------------------------------------------------------------
 # Token management
 # ---------------------------------------------------------------------------
+@contextmanager
+def _token_lock():
+    """Hold an exclusive lock on the token file across processes."""
+    with open(TOKEN_FILE + '.lock', 'w') as lf:
+        fcntl.flock(lf, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lf, fcntl.LOCK_UN)
+
+
 def _load_token():
     """Load saved auth token from disk."""
     if not os.path.exists(TOKEN_FILE):
         return None
     try:
-        with open(TOKEN_FILE) as f:
-            data = json.load(f)
+        with _token_lock():
+            with open(TOKEN_FILE) as f:
+                data = json.load(f)
         return data.get('auth_token')
     except Exception:
         return None
 
 
 def _save_token(auth_token, email=""):
-    """Save auth token to disk."""
-    with open(TOKEN_FILE, 'w') as f:
-        json.dump({
-            'auth_token': auth_token,
-            'email': email,
-            'saved_at': time.strftime('%Y-%m-%d %H:%M:%S'),
-        }, f, indent=2)
+    """Save auth token to disk.
+
+    Writes to a temp file and renames it over TOKEN_FILE so a concurrent
+    reader never sees a half-written file.
+    """
+    tmp_path = TOKEN_FILE + '.tmp'
+    with _token_lock():
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps({
+                'auth_token': auth_token,
+                'email': email,
+                'saved_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            }, separators=(',', ':')))
+        os.replace(tmp_path, TOKEN_FILE)
     print(f"  [Odysee] Auth token saved to {TOKEN_FILE}")
 
 
+# A token that passed user/me is trusted for VERIFY_TTL seconds, so batch
+# uploads don't re-verify it before every video. A 401 from the API drops it.
+VERIFY_TTL = 600
+_verified_token = None
+_verified_at = 0.0
+
+
+def _forget_verified_token():
+    """Drop the cached verification after the API rejects the token."""
+    global _verified_token
+    _verified_token = None
+
+
 def authenticate(email=None, password=None):
     """
     Get a valid Odysee auth token.
@@ -77,11 +145,16 @@ def authenticate(email=None, password=None):
 
     Returns auth_token string or None.
     """
+    global _verified_token, _verified_at
+
     # Try saved token first
     token = _load_token()
     if token:
+        if token == _verified_token and time.time() - _verified_at < VERIFY_TTL:
+            return token
         # Verify it's still valid
         if _verify_token(token):
+            _verified_token, _verified_at = token, time.time()
             print("  [Odysee] Using saved auth token")
             return token
         print("  [Odysee] Saved token expired, re-authenticating...")
@@ -100,7 +173,7 @@ def authenticate(email=None, password=None):
 def _verify_token(token):
     """Check if an auth token is still valid by calling user/me."""
     try:
-        r = requests.post(f'{ODYSEE_API}/user/me', data={
+        r = _session.post(f'{ODYSEE_API}/user/me', data={
             'auth_token': token,
         }, timeout=15)
         if r.status_code == 200:
@@ -121,7 +194,7 @@ def _signin_api(email, password):
     """
     try:
         # Step 1: Get anonymous token
-        r = requests.post(f'{ODYSEE_API}/user/new', data={}, timeout=15)
+        r = _session.post(f'{ODYSEE_API}/user/new', data={}, timeout=15)
         if r.status_code != 200 or not r.json().get('success'):
             print(f"  [Odysee] user/new failed: {r.text[:200]}")
             return None
@@ -129,7 +202,7 @@ def _signin_api(email, password):
         temp_token = r.json()['data']['auth_token']
 
         # Step 2: Sign in
-        r = requests.post(f'{ODYSEE_API}/user/signin', data={
+        r = _session.post(f'{ODYSEE_API}/user/signin', data={
             'auth_token': temp_token,
             'email': email,
             'password': password,
@@ -165,7 +238,7 @@ def _resolve_channel(auth_token, channel_name=None):
 
     try:
         # List user's channels
-        r = requests.post(ODYSEE_PROXY, json={
+        r = _session.post(ODYSEE_PROXY, json={
             'jsonrpc': '2.0',
             'method': 'channel_list',
             'params': {'page': 1, 'page_size': 20},
@@ -175,6 +248,8 @@ def _resolve_channel(auth_token, channel_name=None):
         }, timeout=30)
 
         if r.status_code != 200:
+            if r.status_code == 401:
+                _forget_verified_token()
             print(f"  [Odysee] channel_list failed: HTTP {r.status_code}")
             return None
 
@@ -215,28 +290,58 @@ def _tus_upload(auth_token, file_path):
     """
     Upload a file using TUS resumable protocol.
 
+    With TUS_CONCURRENCY > 1 and a server that supports the TUS concatenation
+    extension, the file goes up as that many partial uploads in parallel,
+    joined by a final concatenation request. Otherwise it is one serial upload.
+
     Returns the file_id (from the Location header) on success, or None.
     """
     file_size = os.path.getsize(file_path)
     file_name = os.path.basename(file_path)
+    metadata = f'filename {_b64encode(file_name)}'
 
     print(f"  [Odysee] TUS upload: {file_name} ({file_size / 1024 / 1024:.1f} MB)")
 
-    # Step 1: Create upload slot
+    concurrency = min(TUS_CONCURRENCY, -(-file_size // CHUNK_SIZE))
+    if concurrency > 1 and _tus_supports_concat(auth_token):
+        file_url = _tus_upload_parallel(auth_token, file_path, file_size, metadata, concurrency)
+    else:
+        # Step 1: Create upload slot
+        file_url = _tus_create(auth_token, {
+            'Upload-Length': str(file_size),
+            'Upload-Metadata': metadata,
+        })
+        # Step 2: Upload data in chunks
+        if file_url and not _tus_patch_range(file_url, auth_token, file_path, 0, file_size, show_progress=True):
+            file_url = None
+
+    if not file_url:
+        return None
+
+    print(f"  [Odysee] TUS upload complete")
+
+    # Extract file_id from URL
+    file_id = file_url.rstrip('/').split('/')[-1]
+    return file_id
+
+
+def _tus_create(auth_token, upload_headers):
+    """POST a TUS creation request. Returns the absolute upload URL, or None."""
     headers = {
-        'Upload-Length': str(file_size),
         'X-Lbry-Auth-Token': auth_token,
         'Tus-Resumable': '1.0.0',
-        'Upload-Metadata': f'filename {_b64encode(file_name)}',
+        **upload_headers,
     }
 
     try:
-        r = requests.post(PUBLISH_URL, headers=headers, timeout=60)
+        r = _session.post(PUBLISH_URL, headers=headers, timeout=60)
     except Exception as e:
         print(f"  [Odysee] TUS create failed: {e}")
         return None
 
     if r.status_code not in (200, 201):
+        if r.status_code == 401:
+            _forget_verified_token()
         print(f"  [Odysee] TUS create failed: HTTP {r.status_code}")
         print(f"  Response: {r.text[:300]}")
         return None
@@ -251,12 +356,26 @@ def _tus_upload(auth_token, file_path):
         file_url = 'https://publish.na-backend.odysee.com' + file_url
 
     print(f"  [Odysee] TUS slot created: {file_url.split('/')[-1][:20]}...")
+    return file_url
+
 
-    # Step 2: Upload data in chunks
+def _tus_patch_range(file_url, auth_token, file_path, start, length, show_progress=False):
+    """
+    PATCH bytes [start, start + length) of file_path to the upload at file_url,
+    in adaptively sized chunks. A PATCH that fails with a network error,
+    429 or 5xx is retried up to PATCH_RETRIES times with exponential backoff,
+    resuming from the server's offset. Each call opens its own file handle.
+    Returns True once all sent.
+    """
     offset = 0
+    failures = 0  # Consecutive failed PATCHes
+    chunk_size = CHUNK_SIZE
+    bandwidth = None  # EWMA of bytes/s over recent PATCHes
+    sent_chunks = 0
     with open(file_path, 'rb') as f:
-        while offset < file_size:
-            chunk = f.read(CHUNK_SIZE)
+        f.seek(start)
+        while offset < length:
+            chunk = f.read(min(chunk_size, length - offset))
             if not chunk:
                 break
 
@@ -267,21 +386,32 @@ def _tus_upload(auth_token, file_path):
                 'Tus-Resumable': '1.0.0',
             }
 
+            sent_at = time.monotonic()
             try:
-                r = requests.patch(file_url, headers=patch_headers, data=chunk, timeout=600)
+                r = _session.patch(file_url, headers=patch_headers, data=chunk, timeout=600)
+                error = None if r.status_code in (200, 204) else f"HTTP {r.status_code}"
             except Exception as e:
-                print(f"  [Odysee] TUS PATCH failed at offset {offset}: {e}")
-                # Try to resume
+                r, error = None, e
+
+            if error:
+                print(f"  [Odysee] TUS PATCH failed at offset {start + offset}: {error}")
+                # A 409 offset mismatch (e.g. an earlier PATCH landed after
+                # all) is fixed by the HEAD resume below; other 4xx won't
+                # succeed on a resend
+                if r is not None and r.status_code < 500 and r.status_code not in (409, 429):
+                    return False
+                failures += 1
+                if failures > PATCH_RETRIES:
+                    return False
+                chunk_size = max(chunk_size // 2, MIN_CHUNK_SIZE)
+                time.sleep(PATCH_RETRY_DELAY * 2 ** (failures - 1))
+                # Resume from wherever the server got to (or resend this chunk)
                 resume_offset = _tus_get_offset(file_url, auth_token)
-                if resume_offset is not None and resume_offset > offset:
+                if resume_offset is not None:
                     offset = resume_offset
-                    f.seek(offset)
-                    continue
-                return None
-
-            if r.status_code not in (200, 204):
-                print(f"  [Odysee] TUS PATCH failed: HTTP {r.status_code}")
-                return None
+                f.seek(start + offset)
+                continue
+            failures = 0
 
             new_offset = r.headers.get('Upload-Offset')
             if new_offset:
@@ -289,21 +419,72 @@ def _tus_upload(auth_token, file_path):
             else:
                 offset += len(chunk)
 
-            pct = (offset / file_size) * 100
-            if pct % 10 < (CHUNK_SIZE / file_size * 100):
-                print(f"  [Odysee] Upload progress: {pct:.0f}%")
+            rate = len(chunk) / max(time.monotonic() - sent_at, 1e-3)
+            bandwidth = rate if bandwidth is None else 0.7 * bandwidth + 0.3 * rate
+            sent_chunks += 1
+            if sent_chunks % 3 == 0:
+                chunk_size = min(max(int(bandwidth * CHUNK_TARGET_SECONDS), MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
 
-    print(f"  [Odysee] TUS upload complete")
+            if show_progress:
+                pct = (offset / length) * 100
+                if pct % 10 < (len(chunk) / length * 100):
+                    print(f"  [Odysee] Upload progress: {pct:.0f}%")
 
-    # Extract file_id from URL
-    file_id = file_url.rstrip('/').split('/')[-1]
-    return file_id
+    return offset >= length
+
+
+def _tus_supports_concat(auth_token):
+    """True if the TUS server lists the concatenation extension (OPTIONS probe)."""
+    try:
+        r = _session.options(PUBLISH_URL, headers={
+            'X-Lbry-Auth-Token': auth_token,
+            'Tus-Resumable': '1.0.0',
+        }, timeout=30)
+        extensions = r.headers.get('Tus-Extension', '')
+        return 'concatenation' in [e.strip() for e in extensions.split(',')]
+    except Exception:
+        return False
+
+
+def _tus_upload_parallel(auth_token, file_path, file_size, metadata, concurrency):
+    """
+    Upload the file as `concurrency` partial TUS uploads sent in parallel,
+    then create the final upload that concatenates them. Returns its URL.
+    """
+    # Contiguous parts, each a whole number of chunks (except the last)
+    part_size = -(-file_size // concurrency)
+    part_size = -(-part_size // CHUNK_SIZE) * CHUNK_SIZE
+    ranges = [(start, min(part_size, file_size - start)) for start in range(0, file_size, part_size)]
+
+    part_urls = []
+    for _, length in ranges:
+        part_url = _tus_create(auth_token, {
+            'Upload-Length': str(length),
+            'Upload-Concat': 'partial',
+        })
+        if not part_url:
+            return None
+        part_urls.append(part_url)
+
+    print(f"  [Odysee] Uploading {len(ranges)} parts in parallel")
+    with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+        futures = [
+            pool.submit(_tus_patch_range, part_url, auth_token, file_path, start, length)
+            for part_url, (start, length) in zip(part_urls, ranges)
+        ]
+        if not all(future.result() for future in futures):
+            return None
+
+    return _tus_create(auth_token, {
+        'Upload-Concat': 'final;' + ' '.join(part_urls),
+        'Upload-Metadata': metadata,
+    })
 
 
 def _tus_get_offset(file_url, auth_token):
     """HEAD request to get current upload offset (for resume)."""
     try:
-        r = requests.head(file_url, headers={
+        r = _session.head(file_url, headers={
             'X-Lbry-Auth-Token': auth_token,
             'Tus-Resumable': '1.0.0',
         }, timeout=30)
@@ -317,7 +498,6 @@ def _tus_get_offset(file_url, auth_token):
 
 def _b64encode(s):
     """Base64 encode a string (for TUS metadata)."""
-    import base64
     return base64.b64encode(s.encode()).decode()
 
 
@@ -362,7 +542,7 @@ def _notify_publish(auth_token, file_id, name, title, description, channel_id, t
     print(f"  [Odysee] Publishing: {clean_name}")
 
     try:
-        r = requests.post(notify_url, headers=headers, json=payload, timeout=120)
+        r = _session.post(notify_url, headers=headers, json=payload, timeout=120)
     except Exception as e:
         print(f"  [Odysee] Notify failed: {e}")
         return None
@@ -399,12 +579,16 @@ def _notify_publish(auth_token, file_id, name, title, description, channel_id, t
         return None
 
 
+_SLUG_INVALID_RE = re.compile(r'[^a-z0-9\-]')
+_SLUG_DASHES_RE = re.compile(r'-+')
+
+
 def _slugify(text):
     """Convert title to URL-safe slug for LBRY name."""
     # Lowercase, replace spaces/special chars with hyphens
     slug = text.lower().strip()
-    slug = re.sub(r'[^a-z0-9\-]', '-', slug)
-    slug = re.sub(r'-+', '-', slug)  # Collapse multiple hyphens
+    slug = _SLUG_INVALID_RE.sub('-', slug)
+    slug = _SLUG_DASHES_RE.sub('-', slug)  # Collapse multiple hyphens
     slug = slug.strip('-')
     # LBRY names have max length
     if len(slug) > 200:
@@ -448,7 +632,7 @@ def _upload_v1_multipart(auth_token, file_path, title, description, channel_id,
 
     try:
         with open(file_path, 'rb') as f:
-            r = requests.post(
+            r = _session.post(
                 publish_v1_url,
                 headers={'X-Lbry-Auth-Token': auth_token},
                 files={'file': (os.path.basename(file_path), f, 'video/mp4')},
@@ -520,14 +704,15 @@ def upload_to_odysee(video_path, title, description, tags=None, channel_name=Non
                 print(f"{prefix} Authentication failed")
                 return None
 
-            # Resolve channel
-            channel_id = _resolve_channel(auth_token, channel_name)
+            # Resolve channel while the TUS upload runs; it's only needed to publish.
+            # Try TUS upload first (better for large files)
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                channel_future = pool.submit(_resolve_channel, auth_token, channel_name)
+                file_id = _tus_upload(auth_token, video_path)
+                channel_id = channel_future.result()
             if not channel_id:
                 print(f"{prefix} Warning: No channel found, publishing to anonymous")
 
-            # Try TUS upload first (better for large files)
-            file_id = _tus_upload(auth_token, video_path)
-
             if file_id:
                 # Notify to finalize
                 result = _notify_publish(
@@ -569,8 +754,9 @@ def upload_to_odysee(video_path, title, description, tags=None, channel_name=Non
             print(f"{prefix} Error: {e}")
 
         if attempt < MAX_RETRIES:
-            print(f"  Retrying in {RETRY_DELAY}s...")
-            time.sleep(RETRY_DELAY)
+            delay = RETRY_DELAY * 2 ** (attempt - 1)
+            print(f"  Retrying in {delay}s...")
+            time.sleep(delay)
 
     print(f"[Odysee] Failed after {MAX_RETRIES} attempts: {last_error}")
     return None